@@ -4,22 +4,56 @@ Backup and Restore Script for PostgreSQL
 Provides crash-safe backup and restore operations with section-based restoration
 """
 
+import asyncio
+import functools
 import logging
 import sys
 import os
+import json
 import subprocess
 import argparse
+from collections import deque
 from datetime import datetime
-from database_connections import DatabaseConnections
+from operator import itemgetter
+import psycopg2
+from psycopg2 import sql
 from config import POSTGRES_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# External multi-threaded compressors for single-file backups (pg_dump's own
+# compression is single-threaded). Commands read stdin and write stdout.
+COMPRESSORS = {
+    'zstd': {
+        'extension': '.zst',
+        'compress': ['zstd', '-q', '-T0', '-3', '--long', '-c'],
+        'decompress': ['zstd', '-q', '-d', '--long', '-c']
+    },
+    'pigz': {
+        'extension': '.gz',
+        'compress': ['pigz', '-c'],
+        'decompress': ['pigz', '-d', '-c']
+    }
+}
+
+# pg_restore sections in dependency order
+SECTIONS = ('pre-data', 'data', 'post-data')
+
 class BackupRestore:
     def __init__(self):
-        self.db_connections = DatabaseConnections()
         self.backup_dir = "backups"
         self._ensure_backup_dir()
+        
+        # Built once and shared by every pg_dump/pg_restore invocation
+        self._pg_env = {**os.environ, 'PGPASSWORD': POSTGRES_CONFIG['password']}
+        self._pg_conn_args = [
+            '-h', POSTGRES_CONFIG['host'],
+            '-p', str(POSTGRES_CONFIG['port']),
+            '-U', POSTGRES_CONFIG['user']
+        ]
+        
+        # Listing cache, invalidated when the underlying archive changes
+        self._toc_cache = {}  # path -> ((mtime, size), toc entries)
     
     def _ensure_backup_dir(self):
         """Ensure backup directory exists"""
@@ -27,45 +61,187 @@ class BackupRestore:
             os.makedirs(self.backup_dir)
             logger.info(f"Created backup directory: {self.backup_dir}")
     
-    def create_backup(self, filename=None):
-        """Create a PostgreSQL backup"""
+    def _run_command(self, cmd, stdin=None, stdout=subprocess.DEVNULL):
+        """Run a pg_* command, streaming stderr to the log; returns (exit code, stderr tail)"""
+        stderr_tail = deque(maxlen=20)
+        with subprocess.Popen(cmd, env=self._pg_env, stdin=stdin, stdout=stdout, stderr=subprocess.PIPE,
+                              text=True, bufsize=1) as proc:
+            for line in proc.stderr:
+                line = line.rstrip()
+                logger.info(f"  {cmd[0]}: {line}")
+                stderr_tail.append(line)
+        return proc.returncode, '\n'.join(stderr_tail)
+    
+    async def _run_command_async(self, cmd):
+        """Async variant of _run_command so several pg_* processes can overlap"""
+        stderr_tail = deque(maxlen=20)
+        proc = await asyncio.create_subprocess_exec(*cmd, env=self._pg_env, stdout=asyncio.subprocess.DEVNULL,
+                                                    stderr=asyncio.subprocess.PIPE)
+        async for line in proc.stderr:
+            line = line.decode(errors='replace').rstrip()
+            logger.info(f"  {cmd[0]}: {line}")
+            stderr_tail.append(line)
+        return await proc.wait(), '\n'.join(stderr_tail)
+    
+    def _drop_page_cache(self, path):
+        """Flush a backup (file or directory) to disk and hint the kernel to evict it from the page cache
+
+        DONTNEED skips dirty pages, and a just-written backup is mostly dirty, so each file is
+        fdatasync'ed first; the extra wait for the disk is intended, as it also makes the backup durable.
+        """
+        if not hasattr(os, 'posix_fadvise'):  # Not available on Windows/macOS
+            return
+        
+        if os.path.isdir(path):
+            files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+        else:
+            files = [path]
+        
+        for file in files:
+            try:
+                fd = os.open(file, os.O_RDONLY)
+                try:
+                    os.fdatasync(fd)
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                logger.debug(f"Could not drop page cache for {file}: {e}")
+    
+    def _compressor_for(self, backup_file):
+        """Get the external compressor a backup file was written with, if any"""
+        for name, compressor in COMPRESSORS.items():
+            if backup_file.endswith(compressor['extension']):
+                return name
+        return None
+    
+    def _run_restore(self, cmd, backup_file):
+        """Run pg_restore on a backup, piping it through the decompressor if needed"""
+        compressor = self._compressor_for(backup_file)
+        if compressor is None:
+            return self._run_command(cmd + [backup_file])
+        
+        # pg_restore cannot run parallel jobs when reading the archive from stdin
+        cmd = [arg for arg in cmd if not arg.startswith('--jobs=')]
+        with open(backup_file, 'rb') as f, \
+                subprocess.Popen(COMPRESSORS[compressor]['decompress'], stdin=f,
+                                 stdout=subprocess.PIPE) as decompress:
+            returncode, stderr = self._run_command(cmd, stdin=decompress.stdout)
+            decompress.stdout.close()
+        
+        if returncode == 0 and decompress.returncode != 0:
+            return decompress.returncode, f"{compressor} exited with code {decompress.returncode}"
+        return returncode, stderr
+    
+    def _run_compressed_dump(self, cmd, filepath, compressor, jobs):
+        """Run pg_dump to stdout piped through an external parallel compressor"""
+        compress_cmd = list(COMPRESSORS[compressor]['compress'])
+        if compressor == 'pigz':
+            compress_cmd[1:1] = ['-p', str(jobs)]
+        
+        with open(filepath, 'wb') as f, \
+                subprocess.Popen(compress_cmd, stdin=subprocess.PIPE, stdout=f) as compress:
+            returncode, stderr = self._run_command(cmd, stdout=compress.stdin)
+            compress.stdin.close()
+        
+        if returncode == 0 and compress.returncode != 0:
+            return compress.returncode, f"{compressor} exited with code {compress.returncode}"
+        return returncode, stderr
+    
+    def _backup_filename(self, dbname=None, compressor=None):
+        """Build a timestamped backup name, tagged with the database when one is given"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        prefix = f"backup_{dbname}" if dbname else "backup"
+        if compressor:
+            return f"{prefix}_{timestamp}.dump{COMPRESSORS[compressor]['extension']}"
+        return f"{prefix}_{timestamp}.dir"
+    
+    def _backup_command(self, filepath, jobs, dbname, compressor=None):
+        """Build the pg_dump command for a backup"""
+        cmd = [
+            'pg_dump',
+            *self._pg_conn_args,
+            '-d', dbname
+        ]
+        
+        if compressor:
+            # Uncompressed custom format on stdout; the compressor does the heavy lifting
+            cmd += ['-Fc', '-Z0']
+        else:
+            # Directory format (required for parallel dump)
+            cmd += ['-Fd', '-j', str(jobs), '-f', filepath]
+        return cmd
+    
+    def create_backup(self, filename=None, jobs=None, compressor=None, dbname=None):
+        """Create a PostgreSQL backup using parallel pg_dump jobs or a parallel compressor"""
+        try:
+            if compressor is not None and compressor not in COMPRESSORS:
+                raise ValueError(f"Unsupported compressor '{compressor}'. Use one of: {', '.join(COMPRESSORS)}")
+            
+            if filename is None:
+                filename = self._backup_filename(dbname, compressor)
+            
+            # Each job opens its own connection, so leave max_connections headroom
+            if jobs is None:
+                jobs = max(1, (os.cpu_count() or 1) // 2)
+            
+            filepath = os.path.join(self.backup_dir, filename)
+            cmd = self._backup_command(filepath, jobs, dbname or POSTGRES_CONFIG['dbname'], compressor)
+            
+            if compressor:
+                logger.info(f"Creating backup: {filepath} (compressed with {compressor})")
+                returncode, stderr = self._run_compressed_dump(cmd, filepath, compressor, jobs)
+            else:
+                logger.info(f"Creating backup: {filepath} ({jobs} parallel jobs)")
+                returncode, stderr = self._run_command(cmd)
+            
+            if returncode == 0:
+                self._drop_page_cache(filepath)
+                logger.info(f"✓ Backup created successfully: {filepath}")
+                return filepath
+            else:
+                logger.error(f"✗ Backup failed: {stderr}")
+                return None
+                
+        except Exception as e:
+            logger.error(f"Backup creation failed: {e}")
+            return None
+    
+    async def create_backup_async(self, dbname=None, filename=None, jobs=None):
+        """Create a directory-format backup without blocking the event loop"""
         try:
             if filename is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"backup_{timestamp}.dump"
+                filename = self._backup_filename(dbname)
+            
+            if jobs is None:
+                jobs = max(1, (os.cpu_count() or 1) // 2)
             
             filepath = os.path.join(self.backup_dir, filename)
+            cmd = self._backup_command(filepath, jobs, dbname or POSTGRES_CONFIG['dbname'])
             
-            # Build pg_dump command
-            cmd = [
-                'pg_dump',
-                '-Fc',  # Custom format
-                '-h', POSTGRES_CONFIG['host'],
-                '-p', str(POSTGRES_CONFIG['port']),
-                '-U', POSTGRES_CONFIG['user'],
-                '-d', POSTGRES_CONFIG['dbname'],
-                '-f', filepath
-            ]
-            
-            # Set password environment variable
-            env = os.environ.copy()
-            env['PGPASSWORD'] = POSTGRES_CONFIG['password']
-            
-            logger.info(f"Creating backup: {filepath}")
-            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            
-            if result.returncode == 0:
+            logger.info(f"Creating backup: {filepath} ({jobs} parallel jobs)")
+            returncode, stderr = await self._run_command_async(cmd)
+            
+            if returncode == 0:
+                self._drop_page_cache(filepath)
                 logger.info(f"✓ Backup created successfully: {filepath}")
                 return filepath
             else:
-                logger.error(f"✗ Backup failed: {result.stderr}")
+                logger.error(f"✗ Backup failed: {stderr}")
                 return None
                 
         except Exception as e:
             logger.error(f"Backup creation failed: {e}")
             return None
     
-    def restore_backup(self, backup_file, target_db=None, sections=None, crash_safe=False):
+    def backup_databases(self, dbnames, jobs=None):
+        """Back up several databases concurrently; returns {dbname: filepath or None}"""
+        async def run_all():
+            return await asyncio.gather(*(self.create_backup_async(dbname, jobs=jobs) for dbname in dbnames))
+        
+        return dict(zip(dbnames, asyncio.run(run_all())))
+    
+    def restore_backup(self, backup_file, target_db=None, sections=None, crash_safe=False, jobs=None):
         """Restore PostgreSQL backup"""
         try:
             if not os.path.exists(backup_file):
@@ -75,80 +251,139 @@ class BackupRestore:
             if target_db is None:
                 target_db = POSTGRES_CONFIG['dbname']
             
+            if jobs is None:
+                jobs = os.cpu_count() or 1
+            
             logger.info(f"Restoring backup: {backup_file} to database: {target_db}")
             
             if crash_safe:
-                return self._crash_safe_restore(backup_file, target_db, sections)
+                return self._crash_safe_restore(backup_file, target_db, sections, jobs)
             else:
-                return self._full_restore(backup_file, target_db)
+                return self._full_restore(backup_file, target_db, jobs)
                 
         except Exception as e:
             logger.error(f"Restore failed: {e}")
             return False
     
-    def _full_restore(self, backup_file, target_db):
+    def _full_restore_command(self, target_db, jobs=1):
+        """Build the pg_restore command (without the archive) for a full restore"""
+        return [
+            'pg_restore',
+            *self._pg_conn_args,
+            '-d', target_db,
+            f'--jobs={jobs}',
+            '--clean',
+            '--if-exists'
+        ]
+    
+    def _exec(self, cmd):
+        """Replace the current process with cmd (POSIX only); never returns"""
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+        os.execvpe(cmd[0], cmd, self._pg_env)
+    
+    def exec_backup(self, filename=None, jobs=None, dbname=None):
+        """Create a directory-format backup by exec'ing pg_dump in place of this process"""
+        if filename is None:
+            filename = self._backup_filename(dbname)
+        if jobs is None:
+            jobs = max(1, (os.cpu_count() or 1) // 2)
+        
+        filepath = os.path.join(self.backup_dir, filename)
+        logger.info(f"Creating backup: {filepath} ({jobs} parallel jobs)")
+        self._exec(self._backup_command(filepath, jobs, dbname or POSTGRES_CONFIG['dbname']))
+    
+    def exec_restore(self, backup_file, target_db=None, jobs=None):
+        """Recreate the target database, then exec pg_restore in place of this process"""
+        if target_db is None:
+            target_db = POSTGRES_CONFIG['dbname']
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        
+        if not self._recreate_database(target_db):
+            return False
+        
+        logger.info(f"Restoring backup: {backup_file} to database: {target_db}")
+        self._exec(self._full_restore_command(target_db, jobs) + [backup_file])
+    
+    def _full_restore(self, backup_file, target_db, jobs=1):
         """Perform full restore"""
         try:
             # Drop and recreate database
             self._recreate_database(target_db)
             
             # Restore backup
-            cmd = [
-                'pg_restore',
-                '-h', POSTGRES_CONFIG['host'],
-                '-p', str(POSTGRES_CONFIG['port']),
-                '-U', POSTGRES_CONFIG['user'],
-                '-d', target_db,
-                '--clean',
-                '--if-exists',
-                backup_file
-            ]
-            
-            env = os.environ.copy()
-            env['PGPASSWORD'] = POSTGRES_CONFIG['password']
-            
-            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            
-            if result.returncode == 0:
+            cmd = self._full_restore_command(target_db, jobs)
+            returncode, stderr = self._run_restore(cmd, backup_file)
+            
+            if returncode == 0:
+                self._drop_page_cache(backup_file)
                 logger.info(f"✓ Full restore completed successfully")
                 return True
             else:
-                logger.error(f"✗ Full restore failed: {result.stderr}")
+                logger.error(f"✗ Full restore failed: {stderr}")
                 return False
                 
         except Exception as e:
             logger.error(f"Full restore failed: {e}")
             return False
     
-    def _crash_safe_restore(self, backup_file, target_db, sections=None):
+    def _checkpoint_path(self, backup_file):
+        """Get path of the crash-safe restore checkpoint for a backup"""
+        return backup_file.rstrip(os.sep) + '.restore.json'
+    
+    def _load_checkpoint(self, backup_file, target_db):
+        """Load sections already restored into target_db from a previous run"""
+        checkpoint_file = self._checkpoint_path(backup_file)
+        try:
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return []
+        
+        if checkpoint.get('target_db') != target_db:
+            return []
+        return checkpoint.get('done', [])
+    
+    def _save_checkpoint(self, backup_file, target_db, done):
+        """Record sections restored so far so a rerun can resume"""
+        with open(self._checkpoint_path(backup_file), 'w', encoding='utf-8') as f:
+            json.dump({'target_db': target_db, 'done': done}, f)
+    
+    def _crash_safe_restore(self, backup_file, target_db, sections=None, jobs=1):
         """Perform crash-safe restore with sections"""
         try:
             if sections is None:
-                sections = ['pre-data', 'data', 'post-data']
+                sections = list(SECTIONS)
+            
+            done = self._load_checkpoint(backup_file, target_db)
+            if done:
+                logger.info(f"Resuming crash-safe restore, already restored: {done}")
             
             logger.info(f"Starting crash-safe restore with sections: {sections}")
             
             # Step 1: Pre-data (schema, functions, procedures)
-            if 'pre-data' in sections:
+            if 'pre-data' in sections and 'pre-data' not in done:
                 logger.info("Restoring pre-data section...")
-                if not self._restore_section(backup_file, target_db, 'pre-data'):
+                if not self._restore_sections(backup_file, target_db, ['pre-data']):
                     logger.error("Pre-data restore failed")
                     return False
+                done.append('pre-data')
+                self._save_checkpoint(backup_file, target_db, done)
             
-            # Step 2: Data (table data)
-            if 'data' in sections:
-                logger.info("Restoring data section...")
-                if not self._restore_section(backup_file, target_db, 'data'):
-                    logger.error("Data restore failed")
-                    return False
-            
-            # Step 3: Post-data (indexes, constraints, triggers)
-            if 'post-data' in sections:
-                logger.info("Restoring post-data section...")
-                if not self._restore_section(backup_file, target_db, 'post-data'):
-                    logger.error("Post-data restore failed")
+            # Step 2: Data (table data) and post-data (indexes, constraints, triggers)
+            # share a single pg_restore run so the archive is only read once more
+            remaining = [s for s in ('data', 'post-data') if s in sections and s not in done]
+            if remaining:
+                logger.info(f"Restoring {' + '.join(remaining)} section(s)...")
+                if not self._restore_sections(backup_file, target_db, remaining, jobs):
+                    logger.error(f"{' + '.join(remaining)} restore failed")
                     return False
+                done.extend(remaining)
+                self._save_checkpoint(backup_file, target_db, done)
             
+            if os.path.exists(self._checkpoint_path(backup_file)):
+                os.remove(self._checkpoint_path(backup_file))
             logger.info("✓ Crash-safe restore completed successfully")
             return True
             
@@ -156,37 +391,75 @@ class BackupRestore:
             logger.error(f"Crash-safe restore failed: {e}")
             return False
     
-    def _restore_section(self, backup_file, target_db, section):
-        """Restore a specific section"""
+    def _restore_sections_command(self, target_db, sections, jobs=1):
+        """Build the pg_restore command (without the archive) for the given sections"""
+        cmd = [
+            'pg_restore',
+            *self._pg_conn_args,
+            '-d', target_db,
+            *[f'--section={section}' for section in sections],
+            '--clean',
+            '--if-exists'
+        ]
+        
+        # Pre-data is serial by design; data loads and index builds parallelize
+        if 'pre-data' not in sections and jobs > 1:
+            cmd.append(f'--jobs={jobs}')
+        return cmd
+    
+    def _restore_sections(self, backup_file, target_db, sections, jobs=1):
+        """Restore one or more sections with a single pg_restore run"""
+        label = ' + '.join(sections)
+        try:
+            cmd = self._restore_sections_command(target_db, sections, jobs)
+            returncode, stderr = self._run_restore(cmd, backup_file)
+            
+            if returncode == 0:
+                logger.info(f"✓ {label} section(s) restored successfully")
+                return True
+            else:
+                logger.error(f"✗ {label} section(s) restore failed: {stderr}")
+                return False
+                
+        except Exception as e:
+            logger.error(f"{label} section(s) restore failed: {e}")
+            return False
+    
+    async def _restore_sections_async(self, backup_file, target_db, sections, jobs=1):
+        """Async variant of _restore_sections for uncompressed archives"""
+        label = ' + '.join(sections)
         try:
-            cmd = [
-                'pg_restore',
-                '-h', POSTGRES_CONFIG['host'],
-                '-p', str(POSTGRES_CONFIG['port']),
-                '-U', POSTGRES_CONFIG['user'],
-                '-d', target_db,
-                f'--section={section}',
-                '--clean',
-                '--if-exists',
-                backup_file
-            ]
-            
-            env = os.environ.copy()
-            env['PGPASSWORD'] = POSTGRES_CONFIG['password']
-            
-            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                logger.info(f"✓ {section} section restored successfully")
+            if self._compressor_for(backup_file):
+                raise ValueError("async restore does not support compressed archives")
+            
+            cmd = self._restore_sections_command(target_db, sections, jobs) + [backup_file]
+            returncode, stderr = await self._run_command_async(cmd)
+            
+            if returncode == 0:
+                logger.info(f"✓ {label} section(s) restored successfully into {target_db}")
                 return True
             else:
-                logger.error(f"✗ {section} section restore failed: {result.stderr}")
+                logger.error(f"✗ {label} section(s) restore into {target_db} failed: {stderr}")
                 return False
                 
         except Exception as e:
-            logger.error(f"{section} section restore failed: {e}")
+            logger.error(f"{label} section(s) restore into {target_db} failed: {e}")
             return False
     
+    def restore_to_databases(self, backup_file, target_dbs, sections=None, jobs=None):
+        """Restore one archive into several existing databases concurrently"""
+        if sections is None:
+            sections = list(SECTIONS)
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        
+        async def run_all():
+            return await asyncio.gather(
+                *(self._restore_sections_async(backup_file, target_db, sections, jobs) for target_db in target_dbs)
+            )
+        
+        return dict(zip(target_dbs, asyncio.run(run_all())))
+    
     def _recreate_database(self, db_name):
         """Drop and recreate database"""
         try:
@@ -199,22 +472,27 @@ class BackupRestore:
                 f"password={POSTGRES_CONFIG['password']}"
             )
             
-            with self.db_connections.get_postgres_connection() as conn:
+            # The pooled connections point at the target database itself, which
+            # cannot be dropped while connected, so use a dedicated admin connection
+            conn = psycopg2.connect(admin_dsn)
+            try:
                 conn.autocommit = True
                 with conn.cursor() as cur:
                     # Terminate connections to target database
-                    cur.execute(f"""
+                    cur.execute("""
                         SELECT pg_terminate_backend(pid)
                         FROM pg_stat_activity
-                        WHERE datname = '{db_name}' AND pid <> pg_backend_pid()
-                    """)
+                        WHERE datname = %s AND pid <> pg_backend_pid()
+                    """, (db_name,))
                     
                     # Drop database if exists
-                    cur.execute(f"DROP DATABASE IF EXISTS {db_name}")
+                    cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(db_name)))
                     
                     # Create new database
-                    cur.execute(f"CREATE DATABASE {db_name}")
-                    
+                    cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(db_name)))
+            finally:
+                conn.close()
+            
             logger.info(f"Database {db_name} recreated successfully")
             return True
             
@@ -222,24 +500,34 @@ class BackupRestore:
             logger.error(f"Failed to recreate database {db_name}: {e}")
             return False
     
+    def _backup_size(self, filepath):
+        """Get backup size in bytes (directory-format backups are summed)"""
+        if not os.path.isdir(filepath):
+            return os.path.getsize(filepath)
+        
+        total = 0
+        with os.scandir(filepath) as entries:
+            for entry in entries:
+                total += self._backup_size(entry.path) if entry.is_dir() else entry.stat().st_size
+        return total
+    
     def list_backups(self):
         """List available backups"""
         try:
             backups = []
-            for file in os.listdir(self.backup_dir):
-                if file.endswith('.dump'):
-                    filepath = os.path.join(self.backup_dir, file)
-                    size = os.path.getsize(filepath)
-                    modified = datetime.fromtimestamp(os.path.getmtime(filepath))
-                    backups.append({
-                        'filename': file,
-                        'size': size,
-                        'modified': modified
-                    })
+            with os.scandir(self.backup_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(('.dump', '.dir', '.zst', '.gz')):
+                        st = entry.stat()
+                        backups.append({
+                            'filename': entry.name,
+                            'size': self._backup_size(entry.path) if entry.is_dir() else st.st_size,
+                            'modified': datetime.fromtimestamp(st.st_mtime)
+                        })
             
             if backups:
                 logger.info("Available backups:")
-                for backup in sorted(backups, key=lambda x: x['modified'], reverse=True):
+                for backup in sorted(backups, key=itemgetter('modified'), reverse=True):
                     logger.info(f"  {backup['filename']} ({backup['size']} bytes, {backup['modified']})")
             else:
                 logger.info("No backups found")
@@ -250,17 +538,64 @@ class BackupRestore:
             logger.error(f"Failed to list backups: {e}")
             return []
 
-def main():
-    """Main function"""
+    def get_backup_contents(self, backup_file):
+        """Get the archive table of contents (pg_restore --list), cached until the archive changes"""
+        try:
+            st = os.stat(backup_file)
+            key = (st.st_mtime, st.st_size)
+            cached = self._toc_cache.get(backup_file)
+            if cached and cached[0] == key:
+                return cached[1]
+            
+            compressor = self._compressor_for(backup_file)
+            if compressor is None:
+                result = subprocess.run(['pg_restore', '--list', backup_file], capture_output=True, text=True)
+            else:
+                with open(backup_file, 'rb') as f, \
+                        subprocess.Popen(COMPRESSORS[compressor]['decompress'], stdin=f,
+                                         stdout=subprocess.PIPE) as decompress:
+                    result = subprocess.run(['pg_restore', '--list'], stdin=decompress.stdout,
+                                            capture_output=True, text=True)
+                    decompress.stdout.close()
+            
+            if result.returncode != 0:
+                logger.error(f"✗ Failed to read contents of {backup_file}: {result.stderr}")
+                return []
+            
+            # Skip the ';' comment header and blank lines
+            entries = [line for line in result.stdout.splitlines() if line and not line.startswith(';')]
+            self._toc_cache[backup_file] = (key, entries)
+            return entries
+            
+        except Exception as e:
+            logger.error(f"Failed to get contents of {backup_file}: {e}")
+            return []
+
+@functools.lru_cache(maxsize=None)
+def _parser():
+    """Build the CLI argument parser (once per process)"""
     parser = argparse.ArgumentParser(description='PostgreSQL Backup and Restore Tool')
     parser.add_argument('--backup', action='store_true', help='Create a backup')
+    parser.add_argument('--compressor', choices=list(COMPRESSORS),
+                       help='Compress the backup with an external parallel compressor')
     parser.add_argument('--restore', metavar='FILE', help='Restore from backup file')
     parser.add_argument('--list', action='store_true', help='List available backups')
+    parser.add_argument('--contents', metavar='FILE', help='List the table of contents of a backup')
     parser.add_argument('--crash-safe', action='store_true', help='Use crash-safe restore')
-    parser.add_argument('--sections', nargs='+', choices=['pre-data', 'data', 'post-data'],
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS,
                        help='Specify sections for crash-safe restore')
     parser.add_argument('--target-db', help='Target database for restore')
+    parser.add_argument('--jobs', type=int,
+                       help='Number of parallel jobs (default: half the CPU count for backup, all CPUs for restore)')
+    parser.add_argument('--exec', action='store_true',
+                       help='Replace this process with pg_dump/pg_restore for plain backups and full restores '
+                            '(POSIX only; skips the completion log and page-cache hint)')
     
+    return parser
+
+def main():
+    """Main function"""
+    parser = _parser()
     args = parser.parse_args()
     
     # Setup logging
@@ -271,21 +606,33 @@ def main():
     
     backup_restore = BackupRestore()
     
+    # Single-command paths can hand the process over to pg_dump/pg_restore
+    can_exec = args.exec and os.name == 'posix'
+    
     try:
-        if args.backup:
-            filename = backup_restore.create_backup()
+        if args.backup and can_exec and not args.compressor:
+            backup_restore.exec_backup(jobs=args.jobs)
+        
+        elif args.backup:
+            filename = backup_restore.create_backup(jobs=args.jobs, compressor=args.compressor)
             if filename:
                 logger.info(f"Backup created: {filename}")
             else:
                 logger.error("Backup failed")
                 sys.exit(1)
         
+        elif (args.restore and can_exec and not args.crash_safe
+              and os.path.exists(args.restore) and backup_restore._compressor_for(args.restore) is None):
+            backup_restore.exec_restore(args.restore, target_db=args.target_db, jobs=args.jobs)
+            sys.exit(1)  # Only reached if recreating the database failed
+        
         elif args.restore:
             success = backup_restore.restore_backup(
                 args.restore,
                 target_db=args.target_db,
                 sections=args.sections,
-                crash_safe=args.crash_safe
+                crash_safe=args.crash_safe,
+                jobs=args.jobs
             )
             if not success:
                 sys.exit(1)
@@ -293,6 +640,13 @@ def main():
         elif args.list:
             backup_restore.list_backups()
         
+        elif args.contents:
+            entries = backup_restore.get_backup_contents(args.contents)
+            for entry in entries:
+                print(entry)
+            if not entries:
+                sys.exit(1)
+        
         else:
             parser.print_help()
             
@@ -4,23 +4,54 @@ Bulk Data Generator for Migration Testing
 Generates realistic employee data for testing bulk migration performance
 """
 
-import random
-import string
+import multiprocessing
+import os
 import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Generator
+from typing import List, Dict, Generator, Iterable, Optional
 import logging
+from collections import deque
+from itertools import islice, repeat
+from operator import itemgetter
+
+import numpy as np
+import orjson
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # optional: CSV output falls back to the csv module
+    pa = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Output file buffer: large enough that each batch reaches the OS in a few write() calls
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Rows per chunk when pyarrow converts a batch to CSV
+CSV_ARROW_BATCH_ROWS = 1 << 16
+
+# Batches per worker process that may be generated ahead of the consumer in parallel mode
+MAX_BATCHES_IN_FLIGHT_PER_WORKER = 2
+
+def _salary_kernel(experience: np.ndarray, dept_multiplier: np.ndarray, random_factor: np.ndarray) -> np.ndarray:
+    """Salary: base (INR) x experience x department x random factor, computed in place in random_factor"""
+    salary = random_factor
+    salary *= 30000
+    salary *= dept_multiplier
+    salary *= 1 + experience * 0.15
+    return np.round(salary, 2, out=salary)
+
 class BulkDataGenerator:
     """Generates bulk employee data for migration testing"""
     
-    def __init__(self, total_records: int = 10000000):  # 1 crore = 10 million
+    def __init__(self, total_records: int = 10000000, seed: Optional[int] = None):  # 1 crore = 10 million
         self.total_records = total_records
         self.batch_size = 10000  # Generate in batches for memory efficiency
+        self.seed = seed
         
         # Sample data pools for realistic generation
         self.first_names = [
@@ -64,32 +95,11 @@ class BulkDataGenerator:
             "Andhra Pradesh", "Bihar", "Punjab", "Haryana", "Jharkhand",
             "Chhattisgarh", "Odisha", "Assam", "Kerala", "Uttarakhand"
         ]
-
-    def generate_employee_id(self, index: int) -> str:
-        """Generate unique employee ID"""
-        return f"EMP{index:08d}"
-    
-    def generate_email(self, first_name: str, last_name: str, index: int) -> str:
-        """Generate realistic email address"""
-        domain = random.choice(["company.com", "techcorp.in", "enterprise.org", "business.net"])
-        return f"{first_name.lower()}.{last_name.lower()}{index % 1000}@{domain}"
-    
-    def generate_phone(self) -> str:
-        """Generate realistic Indian phone number"""
-        prefixes = ["6", "7", "8", "9"]
-        prefix = random.choice(prefixes)
-        remaining = ''.join(random.choices(string.digits, k=9))
-        return f"+91{prefix}{remaining}"
-    
-    def generate_salary(self, experience_years: int, department: str) -> float:
-        """Generate realistic salary based on experience and department"""
-        base_salary = 30000  # Base salary in INR
         
-        # Experience multiplier
-        exp_multiplier = 1 + (experience_years * 0.15)
+        self.email_domains = ["company.com", "techcorp.in", "enterprise.org", "business.net"]
         
-        # Department multiplier
-        dept_multipliers = {
+        # Department salary multipliers (departments not listed use 1.0)
+        self.dept_multipliers = {
             "Engineering": 1.3,
             "Data Science": 1.4,
             "Product Management": 1.25,
@@ -99,104 +109,294 @@ class BulkDataGenerator:
             "Finance": 1.15,
             "Operations": 1.05
         }
-        dept_multiplier = dept_multipliers.get(department, 1.0)
         
-        # Add some randomness
-        random_factor = random.uniform(0.8, 1.2)
+        # Vectorized generation: pools as object arrays so a whole batch can be
+        # drawn with one RNG call and one fancy-index per column
+        self.rng = np.random.default_rng(seed)
+        self._first_names = np.array(self.first_names, dtype=object)
+        self._last_names = np.array(self.last_names, dtype=object)
+        self._first_names_lower = np.array([name.lower() for name in self.first_names], dtype=object)
+        self._last_names_lower = np.array([name.lower() for name in self.last_names], dtype=object)
+        self._departments = np.array(self.departments, dtype=object)
+        self._job_titles = np.array(self.job_titles, dtype=object)
+        self._cities = np.array(self.cities, dtype=object)
+        self._states = np.array(self.states, dtype=object)
+        self._email_domains = np.array(self.email_domains, dtype=object)
         
-        return round(base_salary * exp_multiplier * dept_multiplier * random_factor, 2)
+        # Multipliers aligned with self.departments, indexed by the drawn department index
+        self._dept_multipliers = np.ones(len(self.departments))
+        for dept, multiplier in self.dept_multipliers.items():
+            self._dept_multipliers[self.departments.index(dept)] = multiplier
+
+    def generate_employee_id(self, index: int) -> str:
+        """Generate unique employee ID"""
+        return f"EMP{index:08d}"
     
-    def generate_hire_date(self, experience_years: int) -> str:
+    def generate_phone(self) -> str:
+        """Generate realistic Indian phone number"""
+        return f"+91{self.rng.integers(6, 10)}{self.rng.integers(0, 10**9):09d}"
+    
+    def generate_hire_date(self, experience_years: int, current_date: Optional[datetime] = None) -> str:
         """Generate hire date based on experience"""
-        current_date = datetime.now()
-        hire_date = current_date - timedelta(days=experience_years * 365 + random.randint(0, 365))
+        current_date = current_date or datetime.now()
+        hire_date = current_date - timedelta(days=experience_years * 365 + int(self.rng.integers(0, 366)))
         return hire_date.strftime("%Y-%m-%d")
     
     def generate_single_employee(self, index: int) -> Dict:
         """Generate a single employee record"""
-        first_name = random.choice(self.first_names)
-        last_name = random.choice(self.last_names)
-        department = random.choice(self.departments)
-        job_title = random.choice(self.job_titles)
-        experience_years = random.randint(0, 25)
-        city = random.choice(self.cities)
-        state = random.choice(self.states)
+        return self._generate_records(index, 1)[0]
+    
+    def generate_batch(self, start_index: int, batch_size: int) -> List[Dict]:
+        """Generate a batch of employee records"""
+        n = max(0, min(batch_size, self.total_records - start_index))
+        return self._generate_records(start_index, n)
+    
+    def generate_batch_columns(self, start_index: int, batch_size: int) -> Dict[str, list]:
+        """Generate a batch as columns (field name -> list of values) without building per-record dicts"""
+        n = max(0, min(batch_size, self.total_records - start_index))
+        return self._generate_columns(start_index, n)
+    
+    def _generate_records(self, start_index: int, n: int) -> List[Dict]:
+        """Generate n employee records starting at start_index"""
+        return _columns_to_records(self._generate_columns(start_index, n))
+    
+    def _generate_columns(self, start_index: int, n: int) -> Dict[str, list]:
+        """Generate n employee records starting at start_index as columns (random draws are vectorized)"""
+        rng = self.rng
+        
+        # One RNG call per column for the whole batch
+        first_idx = rng.integers(0, len(self.first_names), size=n)
+        last_idx = rng.integers(0, len(self.last_names), size=n)
+        dept_idx = rng.integers(0, len(self.departments), size=n)
+        experience = rng.integers(0, 26, size=n)
+        
+        salary = _salary_kernel(experience, self._dept_multipliers[dept_idx], rng.uniform(0.8, 1.2, size=n))
+        
+        indices = range(start_index, start_index + n)
+        emails = [
+            f"{first}.{last}{index % 1000}@{domain}"
+            for first, last, index, domain in zip(
+                self._first_names_lower[first_idx].tolist(),
+                self._last_names_lower[last_idx].tolist(),
+                indices,
+                self._email_domains[rng.integers(0, len(self.email_domains), size=n)].tolist()
+            )
+        ]
+        # Fixed-shape ids and phone numbers are formatted by NumPy's string routines in one pass
+        # each; the leading digit 6-9 and nine more digits make one 10-digit number
+        phone_numbers = rng.integers(6, 10, size=n) * 10**9 + rng.integers(0, 10**9, size=n)
+        phones = np.char.add('+91', phone_numbers.astype(str))
+        employee_ids = np.char.add('EMP', np.char.zfill(np.arange(start_index, start_index + n).astype(str), 8))
+        # One clock read per batch; all records in a batch share the timestamp
+        now = datetime.now()
+        now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Hire date: experience in years plus up to a year back from today, as day arithmetic in C
+        hire_offsets = experience * 365 + rng.integers(0, 366, size=n)
+        hire_dates = np.datetime64(now.date(), 'D') - hire_offsets.astype('timedelta64[D]')
         
         return {
-            'employee_id': self.generate_employee_id(index),
-            'first_name': first_name,
-            'last_name': last_name,
-            'email': self.generate_email(first_name, last_name, index),
-            'phone': self.generate_phone(),
-            'department': department,
-            'job_title': job_title,
-            'salary': self.generate_salary(experience_years, department),
-            'hire_date': self.generate_hire_date(experience_years),
-            'experience_years': experience_years,
-            'city': city,
-            'state': state,
-            'is_active': random.choice([True, False]),
-            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            'employee_id': employee_ids.tolist(),
+            'first_name': self._first_names[first_idx].tolist(),
+            'last_name': self._last_names[last_idx].tolist(),
+            'email': emails,
+            'phone': phones.tolist(),
+            'department': self._departments[dept_idx].tolist(),
+            'job_title': self._job_titles[rng.integers(0, len(self.job_titles), size=n)].tolist(),
+            'salary': salary.tolist(),
+            'hire_date': hire_dates.astype(str).tolist(),
+            'experience_years': experience.tolist(),
+            'city': self._cities[rng.integers(0, len(self.cities), size=n)].tolist(),
+            'state': self._states[rng.integers(0, len(self.states), size=n)].tolist(),
+            'is_active': rng.integers(0, 2, size=n, dtype=bool).tolist(),
+            'created_at': [now_str] * n,
+            'updated_at': [now_str] * n
         }
     
-    def generate_batch(self, start_index: int, batch_size: int) -> List[Dict]:
-        """Generate a batch of employee records"""
-        batch = []
-        for i in range(batch_size):
-            if start_index + i >= self.total_records:
-                break
-            batch.append(self.generate_single_employee(start_index + i))
-        return batch
-    
-    def generate_all_data(self) -> Generator[List[Dict], None, None]:
-        """Generate all data in batches"""
+    def generate_all_data(self, columnar: bool = False) -> Generator[List[Dict], None, None]:
+        """Generate all data in batches (column batches from generate_batch_columns if columnar)"""
         logger.info(f"Starting generation of {self.total_records:,} records in batches of {self.batch_size:,}")
         
+        generate = self.generate_batch_columns if columnar else self.generate_batch
+        # Reseeded per batch exactly as the parallel workers are, so a seed gives the same data either way
+        seed = self._run_seed()
         for batch_start in range(0, self.total_records, self.batch_size):
-            batch = self.generate_batch(batch_start, self.batch_size)
-            logger.info(f"Generated batch {batch_start // self.batch_size + 1}: {len(batch):,} records")
+            self.rng = np.random.default_rng([seed, batch_start])
+            batch = generate(batch_start, self.batch_size)
+            # Per-batch progress is DEBUG: at small batch sizes INFO would mean thousands of lines per run
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Generated batch {batch_start // self.batch_size + 1}: {_batch_length(batch):,} records")
             yield batch
     
+    def generate_all_data_parallel(self, workers: Optional[int] = None,
+                                   columnar: bool = False) -> Generator[List[Dict], None, None]:
+        """Generate all data in batches across worker processes (batches are yielded in order)"""
+        workers = workers or os.cpu_count() or 1
+        logger.info(f"Starting generation of {self.total_records:,} records in batches of {self.batch_size:,} "
+                    f"using {workers} worker processes")
+        
+        # Each batch gets its own RNG stream derived from (seed, batch start), so the
+        # output does not depend on which worker picks up which batch
+        seed = self._run_seed()
+        tasks = ((seed, batch_start, self.batch_size, columnar) for batch_start in range(0, self.total_records, self.batch_size))
+        
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(self.total_records,)) as pool:
+            # At most MAX_BATCHES_IN_FLIGHT_PER_WORKER batches per worker are queued or finished but
+            # not yet consumed, so a slow consumer cannot make results pile up in memory
+            in_flight = deque(pool.apply_async(_generate_batch_worker, (task,))
+                              for task in islice(tasks, workers * MAX_BATCHES_IN_FLIGHT_PER_WORKER))
+            batch_number = 0
+            while in_flight:
+                batch = in_flight.popleft().get()
+                for task in islice(tasks, 1):
+                    in_flight.append(pool.apply_async(_generate_batch_worker, (task,)))
+                batch_number += 1
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Generated batch {batch_number}: {_batch_length(batch):,} records")
+                yield batch
+    
+    def _run_seed(self):
+        """Seed the per-batch RNG streams of one generation run derive from"""
+        return self.seed if self.seed is not None else np.random.SeedSequence().entropy
+    
     def generate_sample_data(self, sample_size: int = 1000) -> List[Dict]:
         """Generate a small sample for testing"""
         logger.info(f"Generating sample of {sample_size:,} records")
         return self.generate_batch(0, sample_size)
     
+    def generate_sample_batches(self, sample_size: int = 1000, columnar: bool = False) -> Generator[List[Dict], None, None]:
+        """Generate a sample in batch_size chunks so it can be streamed to file without holding it all"""
+        generate = self.generate_batch_columns if columnar else self.generate_batch
+        for batch_start in range(0, sample_size, self.batch_size):
+            yield generate(batch_start, min(self.batch_size, sample_size - batch_start))
+    
     def save_to_file(self, filename: str, data: List[Dict], format_type: str = 'csv'):
         """Save generated data to file"""
+        self.save_batches_to_file(filename, [data], format_type)
+    
+    def save_batches_to_file(self, filename: str, batches: Iterable[List[Dict]], format_type: str = 'csv') -> int:
+        """Stream batches to file as they arrive, holding only one batch in memory"""
+        return self.save_column_batches_to_file(filename, map(_records_to_columns, batches), format_type)
+    
+    def save_column_batches_to_file(self, filename: str, batches: Iterable[Dict[str, list]],
+                                    format_type: str = 'csv') -> int:
+        """Stream column batches (see generate_batch_columns) to file as they arrive"""
         if format_type.lower() == 'csv':
-            self._save_to_csv(filename, data)
+            count = self._save_to_csv(filename, batches)
         elif format_type.lower() == 'json':
-            self._save_to_json(filename, data)
+            count = self._save_to_json(filename, batches)
         else:
             raise ValueError("Unsupported format. Use 'csv' or 'json'")
+        
+        logger.info(f"Saved {count:,} records to {filename}")
+        return count
     
-    def _save_to_csv(self, filename: str, data: List[Dict]):
-        """Save data to CSV file"""
+    def _save_to_csv(self, filename: str, batches: Iterable[Dict[str, list]]) -> int:
+        """Save column batches to CSV file"""
         import csv
         
-        if not data:
-            return
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = data[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for row in data:
-                writer.writerow(row)
+        count = 0
+        writer = None
+        with open(filename, 'w', newline='', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as csvfile:
+            for columns in batches:
+                if not _batch_length(columns):
+                    continue
+                
+                if writer is None:
+                    writer = csv.writer(csvfile)
+                    writer.writerow(columns.keys())
+                
+                encoded = _encode_csv_batch_arrow(columns)
+                if encoded is not None:
+                    csvfile.write(encoded)
+                else:
+                    # Single writerows call per batch; rows are zipped straight from the columns
+                    writer.writerows(zip(*columns.values()))
+                count += _batch_length(columns)
         
-        logger.info(f"Saved {len(data):,} records to {filename}")
+        return count
     
-    def _save_to_json(self, filename: str, data: List[Dict]):
-        """Save data to JSON file"""
-        import json
+    def _save_to_json(self, filename: str, batches: Iterable[Dict[str, list]]) -> int:
+        """Save column batches to JSON file as a single array (same layout as json.dump with indent=2)"""
+        count = 0
+        with open(filename, 'wb', buffering=WRITE_BUFFER_SIZE) as jsonfile:
+            jsonfile.write(b'[')
+            for columns in batches:
+                if not _batch_length(columns):
+                    continue
+                # Encode the whole batch at once and splice its elements into the outer array
+                if count:
+                    jsonfile.write(b',')
+                jsonfile.write(orjson.dumps(_columns_to_records(columns), option=orjson.OPT_INDENT_2)[1:-2])
+                count += _batch_length(columns)
+            jsonfile.write(b'\n]' if count else b']')
         
-        with open(filename, 'w', encoding='utf-8') as jsonfile:
-            json.dump(data, jsonfile, indent=2, ensure_ascii=False)
+        return count
+
+def _batch_length(batch) -> int:
+    """Number of records in a record batch (list of dicts) or column batch (dict of lists)"""
+    if isinstance(batch, dict):
+        return len(next(iter(batch.values()), ()))
+    return len(batch)
+
+def _encode_csv_batch_arrow(columns: Dict[str, list]) -> Optional[str]:
+    """Encode a column batch as CSV rows with pyarrow, byte-for-byte as csv.writer would; None if it can't"""
+    if pa is None:
+        return None
+    try:
+        table = pa.table(columns)
+        for index, field in enumerate(table.schema):
+            column = table[field.name]
+            if pa.types.is_boolean(field.type):
+                # csv.writer renders booleans as Python does
+                table = table.set_column(index, field.name, pc.if_else(column, 'True', 'False'))
+            elif pa.types.is_floating(field.type):
+                # Arrow formats floats like repr() only in this range, apart from dropping '.0' on whole numbers
+                magnitude = pc.abs(column)
+                in_range = pc.or_(pc.equal(column, 0),
+                                  pc.and_(pc.greater_equal(magnitude, 1e-4), pc.less(magnitude, 1e10)))
+                if not pc.all(in_range).as_py():
+                    return None
+                text = pc.cast(column, pa.string())
+                text = pc.if_else(pc.match_substring(text, '.'), text, pc.binary_join_element_wise(text, '.0', ''))
+                table = table.set_column(index, field.name, text)
+            elif not (pa.types.is_string(field.type) or pa.types.is_integer(field.type) or pa.types.is_null(field.type)):
+                return None
         
-        logger.info(f"Saved {len(data):,} records to {filename}")
+        # No quoting: Arrow raises on any value that would need quotes, and that batch goes to csv.writer
+        sink = pa.BufferOutputStream()
+        pacsv.write_csv(table, sink, write_options=pacsv.WriteOptions(
+            include_header=False, batch_size=CSV_ARROW_BATCH_ROWS, eol='\r\n', quoting_style='none'))
+        return sink.getvalue().to_pybytes().decode('utf-8')
+    except (pa.ArrowException, OverflowError):
+        return None
+
+def _records_to_columns(records: List[Dict]) -> Dict[str, list]:
+    """Transpose a list of records into a column batch"""
+    if not records:
+        return {}
+    fieldnames = list(records[0].keys())
+    return dict(zip(fieldnames, map(list, zip(*map(itemgetter(*fieldnames), records)))))
+
+def _columns_to_records(columns: Dict[str, list]) -> List[Dict]:
+    """Transpose a column batch into a list of records"""
+    return list(map(dict, map(zip, repeat(tuple(columns.keys())), zip(*columns.values()))))
+
+# Per-process generator used by generate_all_data_parallel workers
+_worker_generator = None
+
+def _init_worker(total_records: int):
+    """Build the worker's generator once (pools and lookup arrays) instead of per batch"""
+    global _worker_generator
+    _worker_generator = BulkDataGenerator(total_records)
+
+def _generate_batch_worker(task):
+    """Generate one batch (records or columns) in a worker process"""
+    seed, start_index, batch_size, columnar = task
+    _worker_generator.rng = np.random.default_rng([seed, start_index])
+    if columnar:
+        return _worker_generator.generate_batch_columns(start_index, batch_size)
+    return _worker_generator.generate_batch(start_index, batch_size)
 
 def main():
     """Main function to demonstrate bulk data generation"""
@@ -208,33 +408,36 @@ def main():
     parser.add_argument('--sample', type=int, default=1000, help='Generate only a sample of records for testing')
     parser.add_argument('--output', type=str, default='bulk_employees.csv', help='Output filename')
     parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='Output format')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Worker processes for full dataset generation (default: CPU count)')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible output')
     
     args = parser.parse_args()
     
     # Initialize generator
-    generator = BulkDataGenerator(args.total)
+    generator = BulkDataGenerator(args.total, seed=args.seed)
     generator.batch_size = args.batch_size
     
     start_time = time.time()
     
     if args.sample:
-        # Generate sample data
-        sample_data = generator.generate_sample_data(args.sample)
-        generator.save_to_file(args.output, sample_data, args.format)
+        # Generate sample data as column batches; no per-row dicts are built for the CSV/JSON writers
+        batches = generator.generate_sample_batches(args.sample, columnar=True)
+        record_count = generator.save_column_batches_to_file(args.output, batches, args.format)
     else:
-        # Generate full dataset
-        all_data = []
-        for batch in generator.generate_all_data():
-            all_data.extend(batch)
-        
-        generator.save_to_file(args.output, all_data, args.format)
+        # Generate full dataset as column batches, writing each batch as soon as it is generated
+        if args.workers and args.workers > 1:
+            batches = generator.generate_all_data_parallel(args.workers, columnar=True)
+        else:
+            batches = generator.generate_all_data(columnar=True)
+        record_count = generator.save_column_batches_to_file(args.output, batches, args.format)
     
     end_time = time.time()
     duration = end_time - start_time
     
     logger.info(f"Data generation completed in {duration:.2f} seconds")
-    logger.info(f"Generated {args.total:,} records")
-    logger.info(f"Average speed: {args.total / duration:,.0f} records/second")
+    logger.info(f"Generated {record_count:,} records")
+    logger.info(f"Average speed: {record_count / duration:,.0f} records/second")
 
 if __name__ == "__main__":
     main()
@@ -1,3 +1,5 @@
+import functools
+import math
 import os
 from dotenv import load_dotenv
 
@@ -23,21 +25,60 @@ POSTGRES_CONFIG = {
     'port': os.getenv('PG_PORT', '5432')
 }
 
+@functools.lru_cache(maxsize=None)
+def sybase_connection_string(database=None):
+    """ODBC connection string for Sybase (SYBASE_CONFIG's database unless one is given), built once per database"""
+    return (
+        f"DRIVER={{{SYBASE_CONFIG['driver']}}};"
+        f"SERVER={SYBASE_CONFIG['server']};"
+        f"PORT={SYBASE_CONFIG['port']};"
+        f"UID={SYBASE_CONFIG['uid']};"
+        f"PWD={SYBASE_CONFIG['pwd']};"
+        f"DATABASE={database or SYBASE_CONFIG['database']}"
+    )
+
 # Migration Settings
 MIGRATION_CONFIG = {
     'batch_size': int(os.getenv('BATCH_SIZE', '1000')),
+    'commit_batches': int(os.getenv('COMMIT_BATCHES', '10')),
     'sync_interval_minutes': int(os.getenv('SYNC_INTERVAL_MINUTES', '5')),
     'log_level': os.getenv('LOG_LEVEL', 'INFO'),
     'enable_logging': os.getenv('ENABLE_LOGGING', 'true').lower() == 'true'
 }
 
-# Bulk Migration Settings
-BULK_MIGRATION_CONFIG = {
-    'bulk_batch_size': int(os.getenv('BULK_BATCH_SIZE', '10000')),
-    'max_records_per_test': int(os.getenv('MAX_RECORDS_PER_TEST', '1000000')),
-    'performance_monitoring': os.getenv('PERFORMANCE_MONITORING', 'true').lower() == 'true',
-    'memory_threshold_mb': int(os.getenv('MEMORY_THRESHOLD_MB', '2048')),
-    'cpu_threshold_percent': int(os.getenv('CPU_THRESHOLD_PERCENT', '80')),
-    'enable_parallel_processing': os.getenv('ENABLE_PARALLEL_PROCESSING', 'false').lower() == 'true',
-    'parallel_workers': int(os.getenv('PARALLEL_WORKERS', '4'))
-} 
\ No newline at end of file
+# Bulk Migration Settings (built on first access of config.BULK_MIGRATION_CONFIG, see __getattr__)
+@functools.lru_cache(maxsize=None)
+def _load_bulk_migration_config():
+    return {
+        'bulk_batch_size': int(os.getenv('BULK_BATCH_SIZE', '10000')),
+        'max_records_per_test': int(os.getenv('MAX_RECORDS_PER_TEST', '1000000')),
+        'performance_monitoring': os.getenv('PERFORMANCE_MONITORING', 'true').lower() == 'true',
+        'memory_threshold_mb': int(os.getenv('MEMORY_THRESHOLD_MB', '2048')),
+        'cpu_threshold_percent': int(os.getenv('CPU_THRESHOLD_PERCENT', '80')),
+        'enable_parallel_processing': os.getenv('ENABLE_PARALLEL_PROCESSING', 'false').lower() == 'true',
+        'parallel_workers': int(os.getenv('PARALLEL_WORKERS', '4'))
+    }
+
+def __getattr__(name):
+    if name == 'BULK_MIGRATION_CONFIG':
+        return _load_bulk_migration_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Batch size auto-tuning
+AUTO_BATCH_MIN_ROWS = 50000      # Below this, migrate the whole table in one batch
+AUTO_BATCH_MAX_SIZE = 100000     # Hard cap on rows per batch
+AUTO_BATCH_ROW_BYTES = 1024      # Rough in-memory size of one fetched row
+
+def compute_batch_size(row_count, default=None):
+    """Pick a migration batch size from the table's row count, CPU count and available memory"""
+    import psutil  # deferred: psutil is most of this module's import time
+    
+    default = default or MIGRATION_CONFIG['batch_size']
+    if row_count < AUTO_BATCH_MIN_ROWS:
+        return max(row_count, 1)
+    
+    # Aim for a fixed number of batches per CPU, at least the configured size; the hard cap and
+    # 1% of free memory are applied last so the configured size cannot exceed them
+    batch_size = math.ceil(row_count / ((os.cpu_count() or 1) * 100))
+    memory_cap = psutil.virtual_memory().available // (AUTO_BATCH_ROW_BYTES * 100)
+    return max(min(max(default, batch_size), AUTO_BATCH_MAX_SIZE, memory_cap), 1)
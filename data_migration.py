@@ -1,148 +1,461 @@
+import csv
+import io
 import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, partial
+from psycopg2.extras import execute_values
 from database_connections import DatabaseConnections
-from config import MIGRATION_CONFIG
+from config import MIGRATION_CONFIG, BULK_MIGRATION_CONFIG, compute_batch_size
 import time
 
 logger = logging.getLogger(__name__)
 
+# maintenance_work_mem for rebuilding the indexes dropped around a cold load
+INDEX_BUILD_MEMORY = '512MB'
+
+@lru_cache(maxsize=32)
+def _upsert_sql(table_name, columns, key_column):
+    """INSERT ... ON CONFLICT DO UPDATE template (for execute_values) for one table shape, built once per shape"""
+    update_set = ', '.join([f"{col} = EXCLUDED.{col}" for col in columns if col != key_column])
+    return f"""
+        INSERT INTO {table_name} ({', '.join(columns)})
+        VALUES %s
+        ON CONFLICT ({key_column}) DO UPDATE SET
+            {update_set}
+    """
+
+class ProgressLogger:
+    """Logs cumulative row progress about once per 1% of the total instead of once per batch"""
+    
+    def __init__(self, label, total_rows, steps=100):
+        self.label = label
+        self.total_rows = max(total_rows, 0)
+        self.stride = max(1, self.total_rows // steps)
+        self.count = 0
+        self._next_log = self.stride
+    
+    def tick(self, rows):
+        """Record rows as processed, logging when the next stride boundary is crossed"""
+        self.count += rows
+        if self.count >= self._next_log:
+            percent = f" ({self.count * 100 // self.total_rows}%)" if self.total_rows else ""
+            logger.info(f"{self.label}: {self.count:,}/{self.total_rows:,} rows{percent}")
+            self._next_log = self.count + self.stride
+
 class DataMigration:
-    def __init__(self):
+    def __init__(self, dedicated_sybase=False):
         self.db_connections = DatabaseConnections()
         self.batch_size = MIGRATION_CONFIG['batch_size']
+        self.commit_batches = MIGRATION_CONFIG['commit_batches']
+        self.parallel_workers = (
+            BULK_MIGRATION_CONFIG['parallel_workers'] if BULK_MIGRATION_CONFIG['enable_parallel_processing'] else 1
+        )
+        self._pg_conn = None
+        # pyodbc connections can't be shared between threads, so instances that run alongside
+        # each other open their own Sybase connection instead of using the process-wide one
+        self.dedicated_sybase = dedicated_sybase
+        self._syb_conn = None
+        self.last_verification = {}
+    
+    def _get_postgres_connection(self):
+        """Get the long-lived PostgreSQL connection, acquiring it from the pool on first use"""
+        if self._pg_conn is None or self._pg_conn.closed:
+            self._pg_conn = self.db_connections.get_postgres_connection()
+        return self._pg_conn
+    
+    def _get_sybase_connection(self):
+        """Sybase connection for this instance: the shared one, or its own when dedicated_sybase is set"""
+        if not self.dedicated_sybase:
+            return self.db_connections.get_sybase_connection()
+        if self._syb_conn is None or self._syb_conn.closed:
+            self._syb_conn = self.db_connections.open_sybase_connection()
+        return self._syb_conn
+    
+    def _reset_sybase_connection(self):
+        """Drop this instance's Sybase connection so the next use reconnects"""
+        if not self.dedicated_sybase:
+            self.db_connections.reset_sybase_connection()
+            return
+        try:
+            if self._syb_conn is not None and not self._syb_conn.closed:
+                self._syb_conn.close()
+        except Exception as e:
+            logger.warning(f"Error closing Sybase connection: {e}")
+        self._syb_conn = None
+    
+    def _rollback_postgres(self):
+        """Discard any open transaction on the long-lived connection after a failure"""
+        if self._pg_conn is not None:
+            self._discard_connection_transaction(self._pg_conn)
+    
+    def _discard_connection_transaction(self, conn):
+        """Roll back a connection's open transaction, logging rather than raising on failure"""
+        try:
+            if not conn.closed:
+                conn.rollback()
+        except Exception as e:
+            logger.error(f"Rollback failed: {e}")
+    
+    def close(self):
+        """Return the long-lived PostgreSQL connection to the pool (and close a dedicated Sybase connection)"""
+        if self._pg_conn is not None:
+            self.db_connections.return_postgres_connection(self._pg_conn)
+            self._pg_conn = None
+        if self.dedicated_sybase:
+            self._reset_sybase_connection()
+    
+    def check_connections(self, retries=3, backoff_seconds=1.0):
+        """Ping both databases with SELECT 1, reconnecting with exponential backoff if a connection has dropped"""
+        for attempt in range(1, retries + 1):
+            try:
+                syb_cur = self._get_sybase_connection().cursor()
+                syb_cur.execute("SELECT 1")
+                syb_cur.fetchone()
+                syb_cur.close()
+                
+                pg_conn = self._get_postgres_connection()
+                with pg_conn.cursor() as pg_cur:
+                    pg_cur.execute("SELECT 1")
+                    pg_cur.fetchone()
+                pg_conn.commit()
+                return True
+                
+            except Exception as e:
+                logger.warning(f"Connection check failed (attempt {attempt}/{retries}): {e}")
+                # Discard both connections; the next attempt opens fresh ones
+                self._reset_sybase_connection()
+                if self._pg_conn is not None:
+                    self.db_connections.return_postgres_connection(self._pg_conn, close=True)
+                    self._pg_conn = None
+                if attempt < retries:
+                    time.sleep(backoff_seconds * 2 ** (attempt - 1))
+        
+        logger.error(f"✗ Could not reach the databases after {retries} attempts")
+        return False
+    
+    @contextmanager
+    def _batch_savepoint(self, pg_cur):
+        """Run one batch inside a savepoint so a failure discards only that batch, not the open transaction"""
+        pg_cur.execute("SAVEPOINT migration_batch")
+        try:
+            yield
+        except Exception:
+            pg_cur.execute("ROLLBACK TO SAVEPOINT migration_batch")
+            raise
+        pg_cur.execute("RELEASE SAVEPOINT migration_batch")
+    
+    def _upsert_batch(self, pg_cur, insert_sql, batch):
+        """Upsert one batch as a single multi-row INSERT ... ON CONFLICT statement"""
+        with self._batch_savepoint(pg_cur):
+            execute_values(pg_cur, insert_sql, batch, page_size=len(batch))
+    
+    def _copy_batch(self, pg_cur, copy_sql, batch, savepoint=True):
+        """Bulk-load one batch with COPY FROM STDIN (CSV with NULL written as \\N)"""
+        buf = io.StringIO()
+        # Only rows that actually hold a NULL are copied to substitute \N; the rest go to the writer as-is
+        csv.writer(buf).writerows(
+            row if None not in row else [r'\N' if value is None else value for value in row] for row in batch
+        )
+        buf.seek(0)
+        with self._batch_savepoint(pg_cur) if savepoint else nullcontext():
+            pg_cur.copy_expert(copy_sql, buf)
+    
+    def _drop_secondary_indexes(self, pg_conn, table_name):
+        """Drop a table's indexes that back no constraint (the primary key stays); returns their definitions
+        
+        Building an index once over a loaded table is far cheaper than maintaining it row by row
+        during a bulk load, so cold loads drop these first and rebuild them with _restore_indexes.
+        """
+        with pg_conn.cursor() as pg_cur:
+            pg_cur.execute("""
+                SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+                FROM pg_index i
+                WHERE i.indrelid = %s::regclass
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+            """, (table_name,))
+            indexes = pg_cur.fetchall()
+            for index_name, _ in indexes:
+                pg_cur.execute(f"DROP INDEX {index_name}")
+        pg_conn.commit()
+        if indexes:
+            logger.info(f"Dropped {len(indexes)} index(es) on {table_name} for the bulk load")
+        return [index_def for _, index_def in indexes]
+    
+    def _restore_indexes(self, pg_conn, index_defs):
+        """Recreate indexes dropped by _drop_secondary_indexes, in one transaction"""
+        if not index_defs:
+            return
+        with pg_conn.cursor() as pg_cur:
+            pg_cur.execute(f"SET LOCAL maintenance_work_mem = '{INDEX_BUILD_MEMORY}'")
+            for index_def in index_defs:
+                pg_cur.execute(index_def)
+        pg_conn.commit()
+        logger.info(f"Rebuilt {len(index_defs)} index(es) after the bulk load")
+    
+    def _batch_size_for(self, table_name):
+        """Size fetch/insert batches to the Sybase table; returns (batch size, Sybase row count or -1)"""
+        row_count = self.get_table_row_count(table_name, 'sybase')
+        batch_size = compute_batch_size(row_count, self.batch_size) if row_count >= 0 else self.batch_size
+        logger.info(f"Using batch size {batch_size:,} for {table_name} ({row_count:,} rows)")
+        return batch_size, row_count
+    
+    def _write_employees_batch(self, pg_cur, batch, cold_load):
+        """Write one employees batch: COPY for a cold load into an empty table, upsert otherwise"""
+        if cold_load:
+            self._copy_batch(pg_cur, """
+                COPY employees (id, name, dept, salary, updated_at)
+                FROM STDIN WITH (FORMAT csv, NULL '\\N')
+            """, batch)
+        else:
+            # Insert batch into PostgreSQL as a single multi-row statement
+            self._upsert_batch(pg_cur, """
+                INSERT INTO employees (id, name, dept, salary, updated_at)
+                VALUES %s
+                ON CONFLICT (id) DO UPDATE SET
+                    name = EXCLUDED.name,
+                    dept = EXCLUDED.dept,
+                    salary = EXCLUDED.salary,
+                    updated_at = EXCLUDED.updated_at
+            """, batch)
+    
+    def _freeze_load_employees(self, syb_cur, pg_conn, pg_cur, batch_size, progress):
+        """Cold-load the empty employees table in one transaction with COPY ... FREEZE
+        
+        FREEZE needs the table truncated in the same (sub)transaction, so there are no
+        per-batch savepoints or group commits: any failed batch rolls back the whole load.
+        Returns (batch count, successful rows, failed rows).
+        """
+        pg_conn.commit()
+        pg_cur.execute("SET LOCAL synchronous_commit = off")
+        pg_cur.execute("TRUNCATE employees")
+        
+        batch_num = row_total = 0
+        while True:
+            batch = syb_cur.fetchmany(batch_size)
+            if not batch:
+                break
+            batch_num += 1
+            row_total += len(batch)
+            
+            try:
+                self._copy_batch(pg_cur, """
+                    COPY employees (id, name, dept, salary, updated_at)
+                    FROM STDIN WITH (FORMAT csv, NULL '\\N', FREEZE)
+                """, batch, savepoint=False)
+            except Exception as e:
+                pg_conn.rollback()
+                logger.error(f"✗ Batch {batch_num} failed, cold load rolled back: {e}")
+                return batch_num, 0, row_total
+            
+            progress.tick(len(batch))
+        
+        pg_conn.commit()
+        return batch_num, row_total, 0
+    
+    def _migrate_batches_parallel(self, syb_cur, batch_size, write_batch, progress):
+        """Fetch Sybase batches on this thread into a bounded queue while worker threads write them to PostgreSQL
+        
+        Each worker holds its own pooled connection and group-commits every commit_batches batches.
+        Returns (batch count, successful rows, failed rows).
+        """
+        batches = queue.Queue(maxsize=self.parallel_workers * 2)
+        
+        def consume():
+            success_count = error_count = pending_batches = pending_rows = 0
+            try:
+                with self.db_connections.postgres_connection() as conn:
+                    cur = conn.cursor()
+                    for batch in iter(batches.get, None):
+                        try:
+                            write_batch(cur, batch)
+                            pending_rows += len(batch)
+                        except Exception as e:
+                            error_count += len(batch)
+                            logger.error(f"✗ Batch failed: {e}")
+                        pending_batches += 1
+                        if pending_batches == self.commit_batches:
+                            conn.commit()
+                            success_count += pending_rows
+                            pending_batches = pending_rows = 0
+                    conn.commit()
+                    success_count += pending_rows
+                    cur.close()
+            except Exception as e:
+                # The pool rolls back the returned connection's open transaction
+                error_count += pending_rows
+                logger.error(f"✗ Migration worker failed: {e}")
+                # Keep draining so the producer never blocks on a full queue
+                for batch in iter(batches.get, None):
+                    error_count += len(batch)
+            return success_count, error_count
+        
+        batch_num = 0
+        with ThreadPoolExecutor(max_workers=self.parallel_workers) as executor:
+            workers = [executor.submit(consume) for _ in range(self.parallel_workers)]
+            try:
+                while True:
+                    batch = syb_cur.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    batch_num += 1
+                    batches.put(batch)
+                    progress.tick(len(batch))
+            finally:
+                for _ in workers:
+                    batches.put(None)
+            results = [worker.result() for worker in workers]
+        
+        return batch_num, sum(r[0] for r in results), sum(r[1] for r in results)
     
     def migrate_employees_data(self):
         """Migrate data from Sybase employees table to PostgreSQL"""
-        syb_conn = None
-        pg_conn = None
+        dropped_indexes = []
         try:
             # Get connections
-            syb_conn = self.db_connections.get_sybase_connection()
-            pg_conn = self.db_connections.get_postgres_connection()
+            syb_conn = self._get_sybase_connection()
+            pg_conn = self._get_postgres_connection()
             
             syb_cur = syb_conn.cursor()
             pg_cur = pg_conn.cursor()
             
+            batch_size, row_count = self._batch_size_for('employees')
+            progress = ProgressLogger("Migrated", row_count)
+            
             # Fetch data from Sybase
             logger.info("Fetching data from Sybase employees table...")
             syb_cur.execute("SELECT id, name, dept, salary, updated_at FROM employees")
-            rows = syb_cur.fetchall()
-            
-            if not rows:
-                logger.warning("No data found in Sybase employees table")
-                return False
-            
-            logger.info(f"Found {len(rows)} rows to migrate")
-            
-            # Process in batches
-            success_count = 0
-            error_count = 0
             
-            for i in range(0, len(rows), self.batch_size):
-                batch = rows[i:i + self.batch_size]
-                logger.info(f"Processing batch {i//self.batch_size + 1} ({len(batch)} rows)")
+            # Cold load into an empty table can use COPY; otherwise rows must be upserted
+            pg_cur.execute("SELECT NOT EXISTS (SELECT 1 FROM employees)")
+            cold_load = pg_cur.fetchone()[0]
+            if cold_load:
+                logger.info(f"PostgreSQL employees table is empty, loading with COPY"
+                            f"{' FREEZE' if self.parallel_workers == 1 else ''}")
+                dropped_indexes = self._drop_secondary_indexes(pg_conn, 'employees')
+            
+            write_batch = partial(self._write_employees_batch, cold_load=cold_load)
+            if cold_load and self.parallel_workers == 1:
+                batch_num, success_count, error_count = self._freeze_load_employees(
+                    syb_cur, pg_conn, pg_cur, batch_size, progress
+                )
+            elif self.parallel_workers > 1:
+                pg_conn.commit()
+                batch_num, success_count, error_count = self._migrate_batches_parallel(
+                    syb_cur, batch_size, write_batch, progress
+                )
+            else:
+                # Stream in batches so only one batch is held in memory at a time
+                success_count = 0
+                error_count = 0
+                batch_num = 0
                 
-                try:
-                    # Insert batch into PostgreSQL
-                    for row in batch:
-                        pg_cur.execute("""
-                            INSERT INTO employees (id, name, dept, salary, updated_at)
-                            VALUES (%s, %s, %s, %s, %s)
-                            ON CONFLICT (id) DO UPDATE SET
-                                name = EXCLUDED.name,
-                                dept = EXCLUDED.dept,
-                                salary = EXCLUDED.salary,
-                                updated_at = EXCLUDED.updated_at
-                        """, row)
+                while True:
+                    batch = syb_cur.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    batch_num += 1
                     
-                    pg_conn.commit()
-                    success_count += len(batch)
-                    logger.info(f"✓ Batch {i//self.batch_size + 1} processed successfully")
+                    try:
+                        write_batch(pg_cur, batch)
+                        success_count += len(batch)
+                        
+                    except Exception as e:
+                        error_count += len(batch)
+                        logger.error(f"✗ Batch {batch_num} failed: {e}")
                     
-                except Exception as e:
-                    pg_conn.rollback()
-                    error_count += len(batch)
-                    logger.error(f"✗ Batch {i//self.batch_size + 1} failed: {e}")
+                    progress.tick(len(batch))
+                    
+                    # Group commits: one WAL flush per commit_batches batches
+                    if batch_num % self.commit_batches == 0:
+                        pg_conn.commit()
+                
+                pg_conn.commit()
+            
+            self._restore_indexes(pg_conn, dropped_indexes)
+            dropped_indexes = []
             
             # Close cursors
             syb_cur.close()
             
+            if batch_num == 0:
+                logger.warning("No data found in Sybase employees table")
+                return False
+            
             logger.info(f"Migration completed: {success_count} successful, {error_count} failed")
             return error_count == 0
             
         except Exception as e:
+            self._rollback_postgres()
             logger.error(f"Data migration failed: {e}")
+            if dropped_indexes:
+                try:
+                    self._restore_indexes(self._get_postgres_connection(), dropped_indexes)
+                except Exception as restore_error:
+                    self._rollback_postgres()
+                    logger.error(f"Failed to rebuild dropped indexes on employees: {restore_error}")
             return False
-        finally:
-            # Ensure connections are properly closed/returned
-            if pg_conn:
-                self.db_connections.return_postgres_connection(pg_conn)
     
     def sync_table_data(self, table_name, key_column='id'):
         """Generic method to sync table data from Sybase to PostgreSQL"""
         try:
             # Get connections
-            syb_conn = self.db_connections.get_sybase_connection()
-            pg_conn = self.db_connections.get_postgres_connection()
+            syb_conn = self._get_sybase_connection()
+            pg_conn = self._get_postgres_connection()
             
             syb_cur = syb_conn.cursor()
             pg_cur = pg_conn.cursor()
             
-            # Get all columns from Sybase
-            syb_cur.execute(f"SELECT * FROM {table_name}")
-            columns = [column[0] for column in syb_cur.description]
-            
-            # Build dynamic SELECT query
-            select_columns = ', '.join(columns)
-            placeholders = ', '.join(['%s'] * len(columns))
-            
-            # Fetch data
-            syb_cur.execute(f"SELECT {select_columns} FROM {table_name}")
-            rows = syb_cur.fetchall()
+            batch_size, _ = self._batch_size_for(table_name)
             
-            if not rows:
-                logger.warning(f"No data found in Sybase table {table_name}")
-                return False
-            
-            logger.info(f"Syncing {len(rows)} rows from {table_name}")
+            # Fetch data; the column list comes from the same result set's description
+            syb_cur.execute(f"SELECT * FROM {table_name}")
+            columns = tuple(column[0] for column in syb_cur.description)
             
-            # Build dynamic INSERT/UPDATE query
-            update_set = ', '.join([f"{col} = EXCLUDED.{col}" for col in columns if col != key_column])
+            logger.info(f"Syncing rows from {table_name}")
             
-            insert_sql = f"""
-                INSERT INTO {table_name} ({select_columns})
-                VALUES ({placeholders})
-                ON CONFLICT ({key_column}) DO UPDATE SET
-                    {update_set}
-            """
+            # Dynamic INSERT/UPDATE query, reused across scheduled syncs of the same table shape
+            insert_sql = _upsert_sql(table_name, columns, key_column)
             
             # Process in batches
             success_count = 0
             error_count = 0
             
-            for i in range(0, len(rows), self.batch_size):
-                batch = rows[i:i + self.batch_size]
+            batch_num = 0
+            
+            while True:
+                batch = syb_cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                batch_num += 1
                 
                 try:
-                    for row in batch:
-                        pg_cur.execute(insert_sql, row)
-                    
-                    pg_conn.commit()
+                    self._upsert_batch(pg_cur, insert_sql, batch)
                     success_count += len(batch)
                     
                 except Exception as e:
-                    pg_conn.rollback()
                     error_count += len(batch)
                     logger.error(f"Batch failed: {e}")
+                
+                if batch_num % self.commit_batches == 0:
+                    pg_conn.commit()
+            
+            pg_conn.commit()
             
             # Close cursors
             syb_cur.close()
             pg_cur.close()
-            self.db_connections.return_postgres_connection(pg_conn)
+            
+            if success_count + error_count == 0:
+                logger.warning(f"No data found in Sybase table {table_name}")
+                return False
             
             logger.info(f"Sync completed for {table_name}: {success_count} successful, {error_count} failed")
             return error_count == 0
             
         except Exception as e:
+            self._rollback_postgres()
             logger.error(f"Table sync failed for {table_name}: {e}")
             return False
     
@@ -150,14 +463,14 @@ class DataMigration:
         """Get row count for a table"""
         try:
             if database == 'postgres':
-                conn = self.db_connections.get_postgres_connection()
+                conn = self._get_postgres_connection()
                 cursor = conn.cursor()
                 cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
                 count = cursor.fetchone()[0]
                 cursor.close()
-                self.db_connections.return_postgres_connection(conn)
+                conn.commit()
             else:  # sybase
-                conn = self.db_connections.get_sybase_connection()
+                conn = self._get_sybase_connection()
                 cursor = conn.cursor()
                 cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
                 count = cursor.fetchone()[0]
@@ -166,44 +479,103 @@ class DataMigration:
             return count
             
         except Exception as e:
+            self._rollback_postgres()
             logger.error(f"Failed to get row count for {table_name}: {e}")
             return -1
     
-    def verify_migration(self, table_name):
-        """Verify that data migration was successful"""
+    def get_table_stats(self, table_name, database='postgres', key_column='id'):
+        """Get (row count, min key, max key, key sum) for a table in one query; None on failure
+        
+        The aggregates are computed by the server, so only one small row crosses the wire however
+        large the table is. The key sum is taken as BIGINT (Sybase would overflow INT on large tables).
+        """
+        query = (f"SELECT COUNT(*), MIN({key_column}), MAX({key_column}), SUM(CAST({key_column} AS BIGINT)) "
+                 f"FROM {table_name}")
+        try:
+            if database == 'postgres':
+                conn = self._get_postgres_connection()
+                cursor = conn.cursor()
+                cursor.execute(query)
+                stats = tuple(cursor.fetchone())
+                cursor.close()
+                conn.commit()
+            else:  # sybase
+                conn = self._get_sybase_connection()
+                cursor = conn.cursor()
+                cursor.execute(query)
+                stats = tuple(cursor.fetchone())
+                cursor.close()
+            
+            return stats
+            
+        except Exception as e:
+            self._rollback_postgres()
+            logger.error(f"Failed to get stats for {table_name}: {e}")
+            return None
+    
+    def verify_migration(self, table_name, key_column='id'):
+        """Verify that data migration was successful (row count, key range and key sum match)
+        
+        The stats compared are kept in self.last_verification as {'sybase': ..., 'postgres': ...}
+        so callers can report them without querying again.
+        """
         try:
-            sybase_count = self.get_table_row_count(table_name, 'sybase')
-            postgres_count = self.get_table_row_count(table_name, 'postgres')
+            sybase_stats = self.get_table_stats(table_name, 'sybase', key_column)
+            postgres_stats = self.get_table_stats(table_name, 'postgres', key_column)
+            self.last_verification = {'sybase': sybase_stats, 'postgres': postgres_stats}
             
-            if sybase_count == -1 or postgres_count == -1:
+            if sybase_stats is None or postgres_stats is None:
                 return False
             
-            logger.info(f"Row counts - Sybase: {sybase_count}, PostgreSQL: {postgres_count}")
+            logger.info(f"Row counts - Sybase: {sybase_stats[0]}, PostgreSQL: {postgres_stats[0]}")
             
-            if sybase_count == postgres_count:
-                logger.info("✓ Migration verification successful - row counts match")
+            if sybase_stats == postgres_stats:
+                logger.info("✓ Migration verification successful - row counts, key ranges and key sums match")
                 return True
             else:
-                logger.error(f"✗ Migration verification failed - row counts don't match")
+                logger.error(f"✗ Migration verification failed - Sybase {sybase_stats} != PostgreSQL {postgres_stats} "
+                             f"(count, min {key_column}, max {key_column}, sum {key_column})")
                 return False
                 
         except Exception as e:
             logger.error(f"Migration verification failed: {e}")
             return False
     
+    def _get_sync_watermark(self, pg_cur, table_name):
+        """Read the newest source timestamp already synced for a table (None if never recorded)"""
+        pg_cur.execute("""
+            CREATE TABLE IF NOT EXISTS sync_watermarks (
+                table_name TEXT PRIMARY KEY,
+                last_sync TIMESTAMP NOT NULL
+            )
+        """)
+        pg_cur.execute("SELECT last_sync FROM sync_watermarks WHERE table_name = %s", (table_name,))
+        row = pg_cur.fetchone()
+        return row[0] if row else None
+    
+    def _set_sync_watermark(self, pg_cur, table_name, last_sync):
+        """Persist a table's sync watermark; written in the caller's transaction"""
+        pg_cur.execute("""
+            INSERT INTO sync_watermarks (table_name, last_sync) VALUES (%s, %s)
+            ON CONFLICT (table_name) DO UPDATE SET last_sync = EXCLUDED.last_sync
+        """, (table_name, last_sync))
+    
     def incremental_sync(self, table_name, timestamp_column='updated_at'):
         """Perform incremental sync based on timestamp column"""
         try:
             # Get connections
-            syb_conn = self.db_connections.get_sybase_connection()
-            pg_conn = self.db_connections.get_postgres_connection()
+            syb_conn = self._get_sybase_connection()
+            pg_conn = self._get_postgres_connection()
             
             syb_cur = syb_conn.cursor()
             pg_cur = pg_conn.cursor()
             
-            # Get last sync timestamp from PostgreSQL
-            pg_cur.execute(f"SELECT MAX({timestamp_column}) FROM {table_name}")
-            last_sync = pg_cur.fetchone()[0]
+            # Get last sync timestamp: the persisted watermark, or on the first incremental run the
+            # newest row already in PostgreSQL
+            last_sync = self._get_sync_watermark(pg_cur, table_name)
+            if last_sync is None:
+                pg_cur.execute(f"SELECT MAX({timestamp_column}) FROM {table_name}")
+                last_sync = pg_cur.fetchone()[0]
             
             if last_sync is None:
                 logger.info("No previous sync found, performing full sync")
@@ -211,48 +583,54 @@ class DataMigration:
             
             # Get updated records from Sybase
             syb_cur.execute(f"SELECT * FROM {table_name} WHERE {timestamp_column} > ?", (last_sync,))
-            updated_rows = syb_cur.fetchall()
+            batch = syb_cur.fetchmany(self.batch_size)
             
-            if not updated_rows:
+            if not batch:
+                self._set_sync_watermark(pg_cur, table_name, last_sync)
+                pg_conn.commit()
                 logger.info("No updates found since last sync")
                 return True
             
-            logger.info(f"Found {len(updated_rows)} updated rows for incremental sync")
+            logger.info("Found updated rows for incremental sync")
             
             # Process updates
-            columns = [column[0] for column in syb_cur.description]
-            select_columns = ', '.join(columns)
-            placeholders = ', '.join(['%s'] * len(columns))
+            columns = tuple(column[0] for column in syb_cur.description)
+            timestamp_index = [col.lower() for col in columns].index(timestamp_column.lower())
             
-            # Build dynamic INSERT/UPDATE query
+            # Dynamic INSERT/UPDATE query, reused across scheduled syncs of the same table shape
             key_column = 'id'  # Assuming 'id' is the primary key
-            update_set = ', '.join([f"{col} = EXCLUDED.{col}" for col in columns if col != key_column])
-            
-            insert_sql = f"""
-                INSERT INTO {table_name} ({select_columns})
-                VALUES ({placeholders})
-                ON CONFLICT ({key_column}) DO UPDATE SET
-                    {update_set}
-            """
+            insert_sql = _upsert_sql(table_name, columns, key_column)
             
+            # One upsert statement per fetched chunk, one commit per commit_batches chunks
             success_count = 0
-            for row in updated_rows:
+            error_count = 0
+            batch_num = 0
+            watermark = last_sync
+            while batch:
+                batch_num += 1
                 try:
-                    pg_cur.execute(insert_sql, row)
-                    success_count += 1
+                    self._upsert_batch(pg_cur, insert_sql, batch)
+                    success_count += len(batch)
+                    watermark = max(watermark, max(row[timestamp_index] for row in batch))
                 except Exception as e:
-                    logger.error(f"Failed to sync row: {e}")
+                    error_count += len(batch)
+                    logger.error(f"Failed to sync batch: {e}")
+                if batch_num % self.commit_batches == 0:
+                    pg_conn.commit()
+                batch = syb_cur.fetchmany(self.batch_size)
             
+            # Only advance the watermark when every changed row made it, so failures are retried next run
+            self._set_sync_watermark(pg_cur, table_name, watermark if error_count == 0 else last_sync)
             pg_conn.commit()
             
             # Close cursors
             syb_cur.close()
             pg_cur.close()
-            self.db_connections.return_postgres_connection(pg_conn)
             
             logger.info(f"Incremental sync completed: {success_count} rows updated")
             return True
             
         except Exception as e:
+            self._rollback_postgres()
             logger.error(f"Incremental sync failed: {e}")
             return False 
\ No newline at end of file
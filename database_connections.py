@@ -1,17 +1,43 @@
+import atexit
+import os
+import threading
+from contextlib import contextmanager
 import pyodbc
 import psycopg2
 from psycopg2 import pool
 import logging
-from config import SYBASE_CONFIG, POSTGRES_CONFIG
+from config import POSTGRES_CONFIG, sybase_connection_string
 
 logger = logging.getLogger(__name__)
 
 class DatabaseConnections:
+    # One instance per process: every component shares the same Sybase connection and Postgres pool
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._initialized = False
+            return cls._instance
+    
     def __init__(self):
-        self.sybase_conn = None
-        self.postgres_pool = None
-        self._ensure_postgres_database()
-        self._setup_postgres_pool()
+        # Set up under the lock so no other thread gets the instance before the pool exists; the
+        # flag is only set once setup succeeds, so a failed setup is retried by the next caller
+        with self._instance_lock:
+            if self._initialized:
+                return
+            self.sybase_conn = None
+            self.postgres_pool = None
+            # Named parameterized Sybase statements, each with its own cursor (see execute_prepared)
+            self._sybase_statements = {}
+            self._sybase_cursors = {}
+            self._sybase_conn_str = sybase_connection_string()
+            self._ensure_postgres_database()
+            self._setup_postgres_pool()
+            atexit.register(self.close_all)
+            self._initialized = True
     
     def _ensure_postgres_database(self):
         """Ensure the target PostgreSQL database exists before creating the pool"""
@@ -46,32 +72,55 @@ class DatabaseConnections:
                 f"user={POSTGRES_CONFIG['user']} "
                 f"password={POSTGRES_CONFIG['password']}"
             )
-            self.postgres_pool = pool.SimpleConnectionPool(1, 10, dsn)
+            # Thread-safe pool sized for parallel migration workers
+            self.postgres_pool = pool.ThreadedConnectionPool(1, max(10, (os.cpu_count() or 1) * 2), dsn)
             logger.info("PostgreSQL connection pool created successfully")
         except Exception as e:
             logger.error(f"Failed to create PostgreSQL connection pool: {e}")
             raise
     
+    def open_sybase_connection(self):
+        """Open a new Sybase connection (pyodbc + ASE driver) that the caller owns and closes"""
+        conn = pyodbc.connect(self._sybase_conn_str)
+        logger.info("Sybase connection established successfully using ASE driver")
+        return conn
+    
     def get_sybase_connection(self):
-        """Get Sybase connection (pyodbc + ASE driver)"""
+        """Get the shared Sybase connection (pyodbc + ASE driver)"""
         try:
             if self.sybase_conn is None or self.sybase_conn.closed:
-                connection_string = (
-                    f"DRIVER={{{SYBASE_CONFIG['driver']}}};"
-                    f"SERVER={SYBASE_CONFIG['server']};"
-                    f"PORT={SYBASE_CONFIG['port']};"
-                    f"UID={SYBASE_CONFIG['uid']};"
-                    f"PWD={SYBASE_CONFIG['pwd']};"
-                    f"DATABASE={SYBASE_CONFIG['database']}"
-                )
-                self.sybase_conn = pyodbc.connect(connection_string)
-                logger.info("Sybase connection established successfully using ASE driver")
+                self.sybase_conn = self.open_sybase_connection()
             
             return self.sybase_conn
         except Exception as e:
             logger.error(f"Failed to connect to Sybase: {e}")
             raise
     
+    def prepare_sybase(self, name, sql):
+        """Register a parameterized Sybase statement under a name for execute_prepared"""
+        self._sybase_statements[name] = sql
+    
+    def execute_prepared(self, name, params=()):
+        """Run a registered Sybase statement and return its rowcount (caller commits)"""
+        conn = self.get_sybase_connection()
+        # pyodbc keeps the last statement prepared per cursor, so a dedicated cursor per
+        # statement is parsed and planned once and reused on every later call
+        cursor = self._sybase_cursors.get(name)
+        if cursor is None or cursor.connection is not conn:
+            cursor = self._sybase_cursors[name] = conn.cursor()
+        cursor.execute(self._sybase_statements[name], params)
+        return cursor.rowcount
+    
+    def reset_sybase_connection(self):
+        """Drop the shared Sybase connection so the next get_sybase_connection() reconnects"""
+        self._sybase_cursors.clear()
+        try:
+            if self.sybase_conn is not None and not self.sybase_conn.closed:
+                self.sybase_conn.close()
+        except Exception as e:
+            logger.warning(f"Error closing Sybase connection: {e}")
+        self.sybase_conn = None
+    
     def get_postgres_connection(self):
         """Get PostgreSQL connection from pool"""
         try:
@@ -85,23 +134,35 @@ class DatabaseConnections:
             logger.error(f"Failed to get PostgreSQL connection: {e}")
             raise
     
-    def return_postgres_connection(self, conn):
-        """Return PostgreSQL connection to pool"""
+    @contextmanager
+    def postgres_connection(self):
+        """Borrow a PostgreSQL connection from the pool for the duration of a with-block"""
+        conn = self.get_postgres_connection()
+        try:
+            yield conn
+        finally:
+            self.return_postgres_connection(conn)
+    
+    def return_postgres_connection(self, conn, close=False):
+        """Return PostgreSQL connection to pool (close=True discards it, e.g. after it has dropped)"""
         try:
             if conn is not None:
-                self.postgres_pool.putconn(conn)
+                self.postgres_pool.putconn(conn, close=close)
         except Exception as e:
             logger.error(f"Error returning connection to pool: {e}")
     
     def close_all(self):
         """Close all connections"""
         try:
+            self._sybase_cursors.clear()
             if self.sybase_conn and not self.sybase_conn.closed:
                 self.sybase_conn.close()
                 logger.info("Sybase connection closed")
             
             if self.postgres_pool:
                 self.postgres_pool.closeall()
+                # Recreated on the next get_postgres_connection() if the process keeps going
+                self.postgres_pool = None
                 logger.info("PostgreSQL connection pool closed")
         except Exception as e:
             logger.error(f"Error closing connections: {e}")
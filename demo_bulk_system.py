@@ -4,24 +4,49 @@ Demo script for the bulk migration testing system
 Shows how to use all components step by step
 """
 
+import csv
+import io
 import sys
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+class ThreadOutput(io.TextIOBase):
+    """Stand-in for sys.stdout that collects each demo thread's output separately"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+    
+    def write(self, text):
+        return getattr(self._local, 'buffer', self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def run(self, demo_func):
+        """Run a demo with its output captured; returns (result, output, exception)"""
+        self._local.buffer = io.StringIO()
+        try:
+            return demo_func(), self._local.buffer.getvalue(), None
+        except Exception as e:
+            return False, self._local.buffer.getvalue(), e
+        finally:
+            del self._local.buffer
+
 def print_header(title):
     """Print a formatted header"""
-    print("\n" + "=" * 60)
-    print(f" {title}")
-    print("=" * 60)
+    rule = "=" * 60
+    sys.stdout.write(f"\n{rule}\n {title}\n{rule}\n")
 
 def print_step(step_num, description):
     """Print a formatted step"""
-    print(f"\n{step_num}. {description}")
-    print("-" * 40)
+    sys.stdout.write(f"\n{step_num}. {description}\n{'-' * 40}\n")
 
 def demo_data_generation():
     """Demonstrate data generation capabilities"""
@@ -33,30 +58,29 @@ def demo_data_generation():
         print_step(1, "Creating data generator for 100K records")
         generator = BulkDataGenerator(100000)
         
-        print_step(2, "Generating sample data")
-        start_time = time.time()
-        sample_data = generator.generate_sample_data(1000)  # Start with 1K for demo
-        end_time = time.time()
+        print_step(2, "Generating sample data and streaming it to file")
+        output_file = "demo_sample.csv"
+        start_ns = time.perf_counter_ns()
+        # Batches are written as they are generated, so only one batch is held in memory
+        sample_batches = generator.generate_sample_batches(1000, columnar=True)  # Start with 1K for demo
+        record_count = generator.save_column_batches_to_file(output_file, sample_batches, 'csv')
         
-        duration = end_time - start_time
-        speed = len(sample_data) / duration if duration > 0 else 0
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
+        speed = record_count / duration if duration > 0 else 0
         
-        print(f"✓ Generated {len(sample_data):,} records in {duration:.2f} seconds")
+        print(f"✓ Generated {record_count:,} records in {duration:.2f} seconds")
         print(f"  Speed: {speed:,.0f} records/second")
+        print(f"✓ Data saved to: {output_file}")
         
         print_step(3, "Sample data preview")
-        if sample_data:
-            first_record = sample_data[0]
+        with open(output_file, newline='', encoding='utf-8') as csvfile:
+            first_record = next(csv.DictReader(csvfile), None)
+        if first_record:
             print(f"  First record:")
             for key, value in list(first_record.items())[:5]:  # Show first 5 fields
                 print(f"    {key}: {value}")
             print(f"    ... and {len(first_record) - 5} more fields")
         
-        print_step(4, "Saving to file")
-        output_file = "demo_sample.csv"
-        generator.save_to_file(output_file, sample_data, 'csv')
-        print(f"✓ Data saved to: {output_file}")
-        
         return True
         
     except ImportError as e:
@@ -81,17 +105,10 @@ def demo_performance_monitoring():
         print_step(2, "Getting current system status")
         monitor.print_current_status()
         
-        print_step(3, "Starting monitoring for 5 seconds")
-        print("  Starting monitoring...")
-        monitor.start_monitoring()
-        
-        # Monitor for 5 seconds
-        for i in range(5):
-            time.sleep(1)
-            print(f"  Monitoring... {i+1}/5 seconds")
-        
-        monitor.stop_monitoring()
-        print("  Monitoring stopped")
+        print_step(3, "Collecting 5 samples (at most 5 seconds)")
+        print("  Monitoring...")
+        samples = monitor.sample_for(5, timeout=5)
+        print(f"  Monitoring stopped after {samples} samples")
         
         print_step(4, "Performance summary")
         summary = monitor.get_summary_stats()
@@ -151,11 +168,10 @@ def demo_configuration():
     print_header("CONFIGURATION DEMO")
     
     try:
-        from config import BULK_MIGRATION_CONFIG
+        from config import BULK_MIGRATION_CONFIG, compute_batch_size
         
         print_step(1, "Current bulk migration configuration")
-        for key, value in BULK_MIGRATION_CONFIG.items():
-            print(f"  {key}: {value}")
+        print("\n".join(f"  {key}: {value}" for key, value in BULK_MIGRATION_CONFIG.items()))
         
         print_step(2, "Environment variable configuration")
         print("  Create a .env file with these settings:")
@@ -166,10 +182,9 @@ def demo_configuration():
         print("    CPU_THRESHOLD_PERCENT=80")
         
         print_step(3, "Batch size optimization")
-        print("  Recommended batch sizes:")
-        print("    • High-memory systems (16GB+): 50000")
-        print("    • Moderate systems (8GB): 10000")
-        print("    • Low-memory systems (4GB): 5000")
+        print("  Batch sizes auto-tuned for this system (CPU count and free memory):")
+        for row_count in (100000, 1000000, 10000000):
+            print(f"    • {row_count:,} rows: {compute_batch_size(row_count):,}")
         
         return True
         
@@ -192,15 +207,25 @@ def main():
     success_count = 0
     total_demos = len(demos)
     
-    for demo_name, demo_func in demos:
-        try:
-            if demo_func():
-                success_count += 1
-                print(f"✓ {demo_name} demo completed successfully")
-            else:
-                print(f"✗ {demo_name} demo failed")
-        except Exception as e:
-            print(f"✗ {demo_name} demo failed with error: {e}")
+    # The demos are independent, so run them side by side; each one's output is
+    # captured and printed whole, in the usual order, once it finishes
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=total_demos) as executor:
+            futures = [executor.submit(output.run, demo_func) for _, demo_func in demos]
+            for (demo_name, _), future in zip(demos, futures):
+                result, demo_output, error = future.result()
+                output.stream.write(demo_output)
+                if error is not None:
+                    print(f"✗ {demo_name} demo failed with error: {error}")
+                elif result:
+                    success_count += 1
+                    print(f"✓ {demo_name} demo completed successfully")
+                else:
+                    print(f"✗ {demo_name} demo failed")
+    finally:
+        sys.stdout = output.stream
     
     print_header("DEMO SUMMARY")
     print(f"Completed: {success_count}/{total_demos} demos successfully")
@@ -8,6 +8,7 @@ This script orchestrates the complete migration process including:
 4. Incremental sync testing
 """
 
+import functools
 import logging
 import sys
 import time
@@ -18,8 +19,9 @@ from data_migration import DataMigration
 from config import MIGRATION_CONFIG
 
 # Configure logging
+@functools.lru_cache(maxsize=None)
 def setup_logging():
-    """Setup logging configuration"""
+    """Setup logging configuration (once per process; later calls are no-ops)"""
     log_level = getattr(logging, MIGRATION_CONFIG['log_level'].upper())
     
     logging.basicConfig(
@@ -40,6 +42,7 @@ def main():
     logger.info("Starting Sybase to PostgreSQL Migration")
     logger.info("=" * 60)
     
+    data_migration = None
     try:
         # Initialize components
         db_connections = DatabaseConnections()
@@ -95,13 +98,11 @@ def main():
         
         # Simulate an update in Sybase
         try:
-            syb_conn = db_connections.get_sybase_connection()
-            syb_cur = syb_conn.cursor()
+            db_connections.prepare_sybase('update_emp_salary', "UPDATE employees SET salary = ? WHERE id = ?")
             
-            # Update Bob's salary
-            syb_cur.execute("UPDATE employees SET salary = 80000 WHERE id = 2")
-            syb_conn.commit()
-            syb_cur.close()
+            # Update Bob's salary (the connection's with-block commits, or rolls back on error)
+            with db_connections.get_sybase_connection():
+                db_connections.execute_prepared('update_emp_salary', (80000, 2))
             
             logger.info("✓ Updated Bob's salary to 80000 in Sybase")
             
@@ -129,8 +130,11 @@ def main():
         logger.info("Migration Summary")
         logger.info("=" * 60)
         
-        sybase_count = data_migration.get_table_row_count('employees', 'sybase')
-        postgres_count = data_migration.get_table_row_count('employees', 'postgres')
+        # Counts come from the final verification's stats query, not a second round of COUNT(*)
+        sybase_stats = data_migration.last_verification.get('sybase')
+        postgres_stats = data_migration.last_verification.get('postgres')
+        sybase_count = sybase_stats[0] if sybase_stats else -1
+        postgres_count = postgres_stats[0] if postgres_stats else -1
         
         logger.info(f"Sybase employees table: {sybase_count} rows")
         logger.info(f"PostgreSQL employees table: {postgres_count} rows")
@@ -147,8 +151,10 @@ def main():
         return False
     
     finally:
-        # Clean up connections
+        # Clean up connections (the DataMigration's pooled connection goes back before the pool closes)
         try:
+            if data_migration is not None:
+                data_migration.close()
             db_connections.close_all()
             logger.info("Database connections closed")
         except Exception as e:
@@ -161,6 +167,7 @@ def run_scheduled_sync():
     
     logger.info("Starting scheduled synchronization...")
     
+    data_migration = None
     try:
         data_migration = DataMigration()
         
@@ -172,6 +179,10 @@ def run_scheduled_sync():
             
     except Exception as e:
         logger.error(f"Scheduled sync failed: {e}")
+    finally:
+        # Each run's DataMigration holds a pooled connection; the pool is process-wide
+        if data_migration is not None:
+            data_migration.close()
 
 if __name__ == "__main__":
     success = main()
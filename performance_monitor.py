@@ -4,38 +4,118 @@ Performance Monitor for Bulk Migration
 Monitors system resources during migration operations
 """
 
+import copy
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+import orjson
 import psutil
 import time
 import threading
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
-import json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Column store layout for collected samples: (column, section and key in _collect_metrics() output, dtype).
+# Columns are in the same order as the nested metrics dict; float columns hold NaN for None.
+# Network columns are per-sample deltas and only present with collect_network=True.
+# Timestamps are kept apart as int64 nanoseconds since the epoch and formatted only on export.
+SAMPLE_COLUMNS = [
+    ('cpu_percent', 'cpu', 'percent', np.float64),
+    ('cpu_count', 'cpu', 'count', np.int64),
+    ('cpu_freq_mhz', 'cpu', 'freq_mhz', np.float64),
+    ('memory_total_gb', 'memory', 'total_gb', np.float64),
+    ('memory_available_gb', 'memory', 'available_gb', np.float64),
+    ('memory_used_gb', 'memory', 'used_gb', np.float64),
+    ('memory_percent', 'memory', 'percent', np.float64),
+    ('memory_free_gb', 'memory', 'free_gb', np.float64),
+    ('disk_total_gb', 'disk', 'total_gb', np.float64),
+    ('disk_used_gb', 'disk', 'used_gb', np.float64),
+    ('disk_free_gb', 'disk', 'free_gb', np.float64),
+    ('disk_percent', 'disk', 'percent', np.float64),
+    ('network_bytes_sent', 'network', 'bytes_sent', np.int64),
+    ('network_bytes_recv', 'network', 'bytes_recv', np.int64),
+    ('network_packets_sent', 'network', 'packets_sent', np.int64),
+    ('network_packets_recv', 'network', 'packets_recv', np.int64),
+    ('process_rss_mb', 'process', 'rss_mb', np.float64),
+    ('process_vms_mb', 'process', 'vms_mb', np.float64),
+    ('process_percent', 'process', 'percent', np.float64),
+    ('process_cpu_percent', 'process', 'cpu_percent', np.float64),
+    ('process_threads', 'process', 'num_threads', np.int64),
+]
+INITIAL_SAMPLE_CAPACITY = 256
+STREAM_FLUSH_SAMPLES = 100  # streamed samples held in memory per write to the stream file
+
 class PerformanceMonitor:
     """Monitors system performance during migration operations"""
     
-    def __init__(self, monitoring_interval: float = 1.0):
+    def __init__(self, monitoring_interval: float = 1.0, base_interval: Optional[float] = None,
+                 stable_cpu_delta: float = 2.0, pid: Optional[int] = None,
+                 collect_network: bool = False, disk_every: int = 10,
+                 max_samples: Optional[int] = None):
+        # Sampling is adaptive: it starts at base_interval, doubles while CPU usage stays within
+        # stable_cpu_delta percentage points of the previous sample (up to monitoring_interval),
+        # and drops back to base_interval as soon as it moves
         self.monitoring_interval = monitoring_interval
+        self.base_interval = min(base_interval or monitoring_interval / 10, monitoring_interval)
+        self.stable_cpu_delta = stable_cpu_delta
         self.is_monitoring = False
         self.monitor_thread = None
-        self.performance_data = []
+        self._stop_event = threading.Event()
+        # Notified after every stored sample so callers can wait for data instead of sleeping
+        self._sample_ready = threading.Condition()
+        # Process whose metrics are recorded (this one by default); reused across samples so
+        # process cpu_percent() measures the interval since the previous sample
+        self._process = psutil.Process(pid)
+        # Static for the life of the process, so read once rather than on every sample
+        self._cpu_count = psutil.cpu_count()
+        self._memory_total_gb = round(psutil.virtual_memory().total / (1024**3), 2)
+        self._disk_total_gb = round(psutil.disk_usage('/').total / (1024**3), 2)
+        # Disk usage barely moves between samples, so it is re-read only every disk_every samples
+        self.disk_every = max(disk_every, 1)
+        self._disk_metrics = None
+        self._samples_until_disk = 0
+        # Network traffic is opt-in and recorded as the change since the previous sample
+        self.collect_network = collect_network
+        self._last_network = None
+        self._sample_columns = [column for column in SAMPLE_COLUMNS
+                                if collect_network or column[1] != 'network']
+        # With max_samples only the latest max_samples samples are kept: the column store stops
+        # growing at the next power of two and wraps around, so memory stays flat on long runs
+        self.max_samples = max_samples
+        self._ring_capacity = 1 << (max_samples - 1).bit_length() if max_samples else None
+        self._reset_samples()
         self.start_time = None
         self.end_time = None
+        self._stream = None
+        self._stream_lines = []
+        self._stream_flush_samples = STREAM_FLUSH_SAMPLES
+        
+    def start_monitoring(self, stream_file: Optional[str] = None, flush_every: int = STREAM_FLUSH_SAMPLES):
+        """Start performance monitoring in background thread
         
-    def start_monitoring(self):
-        """Start performance monitoring in background thread"""
+        With stream_file, every sample is also appended to that file as one JSON line as soon as it is
+        collected, so a long or interrupted run keeps its data without a save at the end.
+        Lines reach the file in batches of flush_every samples; streamed timestamps are raw time.time_ns() values.
+        """
         if self.is_monitoring:
             logger.warning("Monitoring is already running")
             return
         
         self.is_monitoring = True
+        self._stop_event.clear()
         self.start_time = datetime.now()
-        self.performance_data = []
+        self._reset_samples()
+        self._stream_flush_samples = max(flush_every, 1)
+        if stream_file:
+            # Unbuffered: lines are batched in _stream_lines and reach the file in one write per batch
+            self._stream = open(stream_file, 'ab', buffering=0)
+            logger.info(f"Streaming performance samples to {stream_file}")
         
         self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.monitor_thread.start()
@@ -49,120 +129,277 @@ class PerformanceMonitor:
             return
         
         self.is_monitoring = False
+        self._stop_event.set()
         self.end_time = datetime.now()
         
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
         
+        if self._stream:
+            self._flush_stream()
+            self._stream.close()
+            self._stream = None
+        
         logger.info("Performance monitoring stopped")
     
+    def run_for(self, seconds: float):
+        """Monitor for a fixed duration, blocking until it has elapsed"""
+        self.start_monitoring()
+        time.sleep(seconds)
+        self.stop_monitoring()
+    
+    def sample_for(self, samples: int, timeout: float) -> int:
+        """Monitor until `samples` samples are collected or `timeout` seconds pass; returns samples taken"""
+        self.start_monitoring()
+        with self._sample_ready:
+            self._sample_ready.wait_for(lambda: self._sample_count >= samples, timeout)
+        self.stop_monitoring()
+        return self._sample_count
+    
     def _monitor_loop(self):
         """Main monitoring loop"""
-        while self.is_monitoring:
+        # Prime the non-blocking CPU counters (psutil tracks the system-wide one per thread,
+        # so this has to happen here) so the first sample covers the first interval
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent()
+        if self.collect_network:
+            self._last_network = psutil.net_io_counters()
+        self._samples_until_disk = 0
+        
+        interval = self.base_interval
+        elapsed = 0.0
+        last_cpu = None
+        # Wait first so each CPU reading spans a full interval; the time spent collecting the
+        # previous sample is taken off the wait to keep the sampling period on schedule.
+        # The wait returns True (ending the loop) as soon as monitoring is stopped.
+        while not self._stop_event.wait(max(interval - elapsed, 0.0)):
+            started = time.monotonic()
             try:
                 # Collect performance metrics
                 metrics = self._collect_metrics()
-                self.performance_data.append(metrics)
+                with self._sample_ready:
+                    self._store_sample(metrics)
+                    self._sample_ready.notify_all()
+                if self._stream:
+                    self._stream_lines.append(orjson.dumps(metrics, option=orjson.OPT_APPEND_NEWLINE))
+                    if len(self._stream_lines) >= self._stream_flush_samples:
+                        self._flush_stream()
                 
-                # Sleep for monitoring interval
-                time.sleep(self.monitoring_interval)
+                # Back off while CPU usage is steady, snap back to the base interval when it changes
+                cpu = metrics['cpu']['percent']
+                if last_cpu is not None and abs(cpu - last_cpu) < self.stable_cpu_delta:
+                    interval = min(interval * 2, self.monitoring_interval)
+                else:
+                    interval = self.base_interval
+                last_cpu = cpu
                 
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
-                time.sleep(self.monitoring_interval)
+            elapsed = time.monotonic() - started
+    
+    def _flush_stream(self):
+        """Write the batched stream lines to the stream file in a single write"""
+        if self._stream_lines:
+            self._stream.write(b''.join(self._stream_lines))
+            self._stream_lines = []
+    
+    def load_samples(self, filename: str):
+        """Replace the collected samples with those streamed to a JSON-lines file (see start_monitoring)"""
+        self._reset_samples()
+        with open(filename, 'rb') as f:
+            for line in f:
+                self._store_sample(orjson.loads(line))
+    
+    def _reset_samples(self):
+        """Start an empty column store: one preallocated array per metric plus the timestamps"""
+        capacity = min(INITIAL_SAMPLE_CAPACITY, self._ring_capacity or INITIAL_SAMPLE_CAPACITY)
+        self._sample_count = 0
+        self._write_index = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._samples = {name: np.empty(capacity, dtype=dtype)
+                         for name, _, _, dtype in self._sample_columns}
+    
+    def _store_sample(self, metrics: Dict):
+        """Append one _collect_metrics() result to the column store, doubling its capacity when full
+        
+        Once a bounded store reaches its ring capacity, the write index wraps and overwrites the oldest sample.
+        """
+        index = self._write_index
+        if index == len(self._timestamps):
+            self._timestamps = _grow(self._timestamps)
+            self._samples = {name: _grow(column) for name, column in self._samples.items()}
+        
+        self._timestamps[index] = metrics['timestamp']
+        for name, section, key, _ in self._sample_columns:
+            value = metrics[section][key]
+            self._samples[name][index] = np.nan if value is None else value
+        
+        self._write_index = index + 1
+        if len(self._timestamps) == self._ring_capacity:
+            self._write_index &= self._ring_capacity - 1
+        if self.max_samples is None or self._sample_count < self.max_samples:
+            self._sample_count += 1
+    
+    def _ordered(self, column: np.ndarray) -> np.ndarray:
+        """The populated part of a column, oldest sample first (a view unless the ring has wrapped)"""
+        if not self._sample_count:
+            return column[:0]
+        start = (self._write_index - self._sample_count) % len(column)
+        end = start + self._sample_count
+        if end <= len(column):
+            return column[start:end]
+        return np.concatenate((column[start:], column[:end - len(column)]))
+    
+    def _column(self, name: str) -> np.ndarray:
+        """One metric over the samples collected so far, oldest first"""
+        return self._ordered(self._samples[name])
+    
+    def _window(self, start: int, end: int) -> 'PerformanceMonitor':
+        """Stopped copy of this monitor holding only samples start..end-1 (counted oldest first)"""
+        window = copy.copy(self)
+        window.is_monitoring = False
+        window.monitor_thread = None
+        window._stream = None
+        window._stream_lines = []
+        window.max_samples = window._ring_capacity = None
+        window._timestamps = self._ordered(self._timestamps)[start:end].copy()
+        window._samples = {name: self._column(name)[start:end].copy() for name in self._samples}
+        window._sample_count = window._write_index = len(window._timestamps)
+        return window
+    
+    @property
+    def performance_data(self) -> List[Dict]:
+        """Collected samples in the nested _collect_metrics() layout, built on demand from the column store"""
+        columns = [(section, key, _column_values(self._column(name)))
+                   for name, section, key, _ in self._sample_columns]
+        records = []
+        for index, timestamp in enumerate(_format_timestamps(self._ordered(self._timestamps))):
+            record = {'timestamp': timestamp}
+            for section, key, values in columns:
+                record.setdefault(section, {})[key] = values[index]
+            records.append(record)
+        return records
     
     def _collect_metrics(self) -> Dict:
-        """Collect current system performance metrics"""
-        timestamp = datetime.now()
+        """Collect current system performance metrics (CPU usage and network traffic since the previous call)"""
+        # Raw epoch nanoseconds: a single integer read per sample, formatted only when exported
+        timestamp = time.time_ns()
+        
+        # Disk metrics (refreshed every disk_every samples)
+        if self._samples_until_disk <= 0 or self._disk_metrics is None:
+            self._disk_metrics = self._disk_metrics_now()
+            self._samples_until_disk = self.disk_every
+        self._samples_until_disk -= 1
+        
+        metrics = {
+            'timestamp': timestamp,
+            'cpu': self._cpu_metrics(psutil.cpu_percent()),
+            'memory': self._memory_metrics(),
+            'disk': dict(self._disk_metrics)
+        }
         
-        # CPU metrics
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        cpu_count = psutil.cpu_count()
-        cpu_freq = psutil.cpu_freq()
+        # Network metrics: traffic since the previous sample
+        if self.collect_network:
+            network = psutil.net_io_counters()
+            metrics['network'] = _network_delta(self._last_network or network, network)
+            self._last_network = network
         
-        # Memory metrics
+        metrics['process'] = self._process_metrics(self._process)
+        return metrics
+    
+    def _cpu_metrics(self, cpu_percent: float) -> Dict:
+        """CPU section of a sample for the given system-wide usage"""
+        cpu_freq = psutil.cpu_freq()
+        return {
+            'percent': cpu_percent,
+            'count': self._cpu_count,
+            'freq_mhz': round(cpu_freq.current, 2) if cpu_freq else None
+        }
+    
+    def _memory_metrics(self) -> Dict:
+        """Memory section of a sample"""
         memory = psutil.virtual_memory()
-        memory_metrics = {
-            'total_gb': round(memory.total / (1024**3), 2),
+        return {
+            'total_gb': self._memory_total_gb,
             'available_gb': round(memory.available / (1024**3), 2),
             'used_gb': round(memory.used / (1024**3), 2),
             'percent': memory.percent,
             'free_gb': round(memory.free / (1024**3), 2)
         }
-        
-        # Disk metrics
+    
+    def _disk_metrics_now(self) -> Dict:
+        """Disk section of a sample, read fresh"""
         disk = psutil.disk_usage('/')
-        disk_metrics = {
-            'total_gb': round(disk.total / (1024**3), 2),
+        return {
+            'total_gb': self._disk_total_gb,
             'used_gb': round(disk.used / (1024**3), 2),
             'free_gb': round(disk.free / (1024**3), 2),
             'percent': disk.percent
         }
-        
-        # Network metrics
-        network = psutil.net_io_counters()
-        network_metrics = {
-            'bytes_sent': network.bytes_sent,
-            'bytes_recv': network.bytes_recv,
-            'packets_sent': network.packets_sent,
-            'packets_recv': network.packets_recv
-        }
-        
-        # Process metrics (current process)
-        process = psutil.Process()
-        process_memory = process.memory_info()
-        process_metrics = {
-            'rss_mb': round(process_memory.rss / (1024**2), 2),
-            'vms_mb': round(process_memory.vms / (1024**2), 2),
-            'percent': process.memory_percent(),
-            'cpu_percent': process.cpu_percent(),
-            'num_threads': process.num_threads()
-        }
-        
-        return {
-            'timestamp': timestamp.isoformat(),
-            'cpu': {
-                'percent': cpu_percent,
-                'count': cpu_count,
-                'freq_mhz': round(cpu_freq.current, 2) if cpu_freq else None
-            },
-            'memory': memory_metrics,
-            'disk': disk_metrics,
-            'network': network_metrics,
-            'process': process_metrics
-        }
+    
+    def _process_metrics(self, process: psutil.Process) -> Dict:
+        """Process section of a sample (CPU usage since that Process object's previous reading)"""
+        # oneshot reads /proc once for all of them
+        with process.oneshot():
+            process_memory = process.memory_info()
+            return {
+                'rss_mb': round(process_memory.rss / (1024**2), 2),
+                'vms_mb': round(process_memory.vms / (1024**2), 2),
+                'percent': process.memory_percent(),
+                'cpu_percent': process.cpu_percent(),
+                'num_threads': process.num_threads()
+            }
     
     def get_current_metrics(self) -> Dict:
-        """Get current performance metrics (without storing)"""
-        return self._collect_metrics()
+        """Get current performance metrics (without storing)
+        
+        The reading is measured over its own short window with its own Process object, network
+        and disk reads, so it can be taken while the sampling thread runs without touching the
+        baselines the stored samples are measured against.
+        """
+        process = psutil.Process(self._process.pid)
+        process.cpu_percent()
+        last_network = psutil.net_io_counters() if self.collect_network else None
+        # cpu_times_percent keeps its own baseline, separate from the cpu_percent() the sampler uses
+        cpu_times = psutil.cpu_times_percent(interval=0.1)
+        
+        metrics = {
+            'timestamp': _format_timestamps([time.time_ns()])[0],
+            'cpu': self._cpu_metrics(round(100 - cpu_times.idle - getattr(cpu_times, 'iowait', 0), 1)),
+            'memory': self._memory_metrics(),
+            'disk': self._disk_metrics_now()
+        }
+        if last_network is not None:
+            metrics['network'] = _network_delta(last_network, psutil.net_io_counters())
+        metrics['process'] = self._process_metrics(process)
+        return metrics
     
     def get_summary_stats(self) -> Dict:
         """Get summary statistics of collected performance data"""
-        if not self.performance_data:
+        if not self._sample_count:
             return {}
         
-        # CPU statistics
-        cpu_percentages = [m['cpu']['percent'] for m in self.performance_data if m['cpu']['percent'] is not None]
-        memory_percentages = [m['memory']['percent'] for m in self.performance_data]
-        process_memory = [m['process']['rss_mb'] for m in self.performance_data]
+        cpu_percentages = self._column('cpu_percent')
+        memory_percentages = self._column('memory_percent')
+        process_memory = self._column('process_rss_mb')
         
         summary = {
-            'total_samples': len(self.performance_data),
+            'total_samples': self._sample_count,
             'monitoring_duration_seconds': (self.end_time - self.start_time).total_seconds() if self.end_time else 0,
             'cpu': {
-                'avg_percent': round(sum(cpu_percentages) / len(cpu_percentages), 2) if cpu_percentages else 0,
-                'max_percent': max(cpu_percentages) if cpu_percentages else 0,
-                'min_percent': min(cpu_percentages) if cpu_percentages else 0
+                'avg_percent': round(float(cpu_percentages.mean()), 2),
+                'max_percent': float(cpu_percentages.max()),
+                'min_percent': float(cpu_percentages.min())
             },
             'memory': {
-                'avg_percent': round(sum(memory_percentages) / len(memory_percentages), 2) if memory_percentages else 0,
-                'max_percent': max(memory_percentages) if memory_percentages else 0,
-                'min_percent': min(memory_percentages) if memory_percentages else 0
+                'avg_percent': round(float(memory_percentages.mean()), 2),
+                'max_percent': float(memory_percentages.max()),
+                'min_percent': float(memory_percentages.min())
             },
             'process_memory': {
-                'avg_mb': round(sum(process_memory) / len(process_memory), 2) if process_memory else 0,
-                'max_mb': max(process_memory) if process_memory else 0,
-                'min_mb': min(process_memory) if process_memory else 0
+                'avg_mb': round(float(process_memory.mean()), 2),
+                'max_mb': float(process_memory.max()),
+                'min_mb': float(process_memory.min())
             }
         }
         
@@ -202,7 +439,7 @@ class PerformanceMonitor:
     
     def save_metrics_to_file(self, filename: str, format_type: str = 'json'):
         """Save collected metrics to file"""
-        if not self.performance_data:
+        if not self._sample_count:
             logger.warning("No performance data to save")
             return
         
@@ -220,14 +457,15 @@ class PerformanceMonitor:
                 'start_time': self.start_time.isoformat() if self.start_time else None,
                 'end_time': self.end_time.isoformat() if self.end_time else None,
                 'monitoring_interval': self.monitoring_interval,
-                'total_samples': len(self.performance_data)
+                'total_samples': self._sample_count
             },
             'summary_stats': self.get_summary_stats(),
             'performance_data': self.performance_data
         }
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Same layout as json.dump(indent=2, ensure_ascii=False), encoded in one call
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
         
         logger.info(f"Performance metrics saved to {filename}")
     
@@ -235,80 +473,151 @@ class PerformanceMonitor:
         """Save metrics to CSV file"""
         import csv
         
-        if not self.performance_data:
+        if not self._sample_count:
             return
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            # Flatten the nested structure for CSV
+            # Flat columns, written straight from the column store
             fieldnames = [
                 'timestamp', 'cpu_percent', 'cpu_count', 'cpu_freq_mhz',
                 'memory_total_gb', 'memory_used_gb', 'memory_available_gb', 'memory_percent',
                 'disk_total_gb', 'disk_used_gb', 'disk_free_gb', 'disk_percent',
                 'process_rss_mb', 'process_vms_mb', 'process_percent', 'process_cpu_percent', 'process_threads'
             ]
+            timestamps = _format_timestamps(self._ordered(self._timestamps))
             
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for metrics in self.performance_data:
-                row = {
-                    'timestamp': metrics['timestamp'],
-                    'cpu_percent': metrics['cpu']['percent'],
-                    'cpu_count': metrics['cpu']['count'],
-                    'cpu_freq_mhz': metrics['cpu']['freq_mhz'],
-                    'memory_total_gb': metrics['memory']['total_gb'],
-                    'memory_used_gb': metrics['memory']['used_gb'],
-                    'memory_available_gb': metrics['memory']['available_gb'],
-                    'memory_percent': metrics['memory']['percent'],
-                    'disk_total_gb': metrics['disk']['total_gb'],
-                    'disk_used_gb': metrics['disk']['used_gb'],
-                    'disk_free_gb': metrics['disk']['free_gb'],
-                    'disk_percent': metrics['disk']['percent'],
-                    'process_rss_mb': metrics['process']['rss_mb'],
-                    'process_vms_mb': metrics['process']['vms_mb'],
-                    'process_percent': metrics['process']['percent'],
-                    'process_cpu_percent': metrics['process']['cpu_percent'],
-                    'process_threads': metrics['process']['num_threads']
-                }
-                writer.writerow(row)
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            writer.writerows(zip(timestamps, *(_column_values(self._column(name)) for name in fieldnames[1:])))
         
         logger.info(f"Performance metrics saved to {filename}")
 
+def _format_timestamps(timestamps_ns) -> List[str]:
+    """Local-time ISO 8601 strings (microsecond precision) for epoch-nanosecond timestamps"""
+    return [datetime.fromtimestamp(ns // 10**9).replace(microsecond=ns // 1000 % 10**6).isoformat()
+            for ns in map(int, timestamps_ns)]
+
+def _network_delta(last, network) -> Dict:
+    """Network section of a sample: traffic between two net_io_counters() readings"""
+    return {
+        'bytes_sent': network.bytes_sent - last.bytes_sent,
+        'bytes_recv': network.bytes_recv - last.bytes_recv,
+        'packets_sent': network.packets_sent - last.packets_sent,
+        'packets_recv': network.packets_recv - last.packets_recv
+    }
+
+def _grow(column: np.ndarray) -> np.ndarray:
+    """Copy a column into a new array of twice the capacity"""
+    grown = np.empty(len(column) * 2, dtype=column.dtype)
+    grown[:len(column)] = column
+    return grown
+
+def _column_values(column: np.ndarray) -> list:
+    """Column as Python values, with NaN (a missing float metric) back to None"""
+    values = column.tolist()
+    if column.dtype.kind == 'f' and np.isnan(column).any():
+        values = [None if value != value else value for value in values]
+    return values
+
+def _run_monitor_process(pid: int, monitoring_interval: float, stream_file: str, stop_event):
+    """Entry point of a tracker's monitor process: sample `pid` into stream_file until stop_event is set"""
+    monitor = PerformanceMonitor(monitoring_interval, pid=pid)
+    # Every sample is written straight away so the tracker can read it while monitoring continues
+    monitor.start_monitoring(stream_file=stream_file, flush_every=1)
+    stop_event.wait()
+    monitor.stop_monitoring()
+
 class MigrationPerformanceTracker:
-    """Tracks performance during specific migration operations"""
+    """Tracks performance during specific migration operations
+    
+    Sampling runs in a separate monitor process that watches this process by pid, so it
+    never competes with the migration for the GIL or shows up in its CPU time. One monitor
+    process serves every operation open at the same time; each operation's stats cover its
+    own range of the shared samples.
+    """
     
     def __init__(self):
         self.monitor = PerformanceMonitor()
         self.operation_metrics = {}
+        self._open_operations = set()
+        self._process = None
+        self._stop_event = None
+        self._stream_file = None
+        self._stream = None
     
     def start_tracking(self, operation_name: str):
         """Start tracking performance for a specific operation"""
         logger.info(f"Starting performance tracking for: {operation_name}")
-        self.monitor.start_monitoring()
+        if self._process is None:
+            self._start_monitor_process()
+        self._read_samples()
+        self._open_operations.add(operation_name)
         self.operation_metrics[operation_name] = {
             'start_time': datetime.now(),
-            'monitor': self.monitor
+            'start_index': self.monitor._sample_count
         }
     
     def stop_tracking(self, operation_name: str):
         """Stop tracking performance for a specific operation"""
-        if operation_name not in self.operation_metrics:
+        if operation_name not in self._open_operations:
             logger.warning(f"No tracking found for operation: {operation_name}")
             return
         
         logger.info(f"Stopping performance tracking for: {operation_name}")
-        self.monitor.stop_monitoring()
-        
-        self.operation_metrics[operation_name]['end_time'] = datetime.now()
-        self.operation_metrics[operation_name]['summary'] = self.monitor.get_summary_stats()
+        tracking = self.operation_metrics[operation_name]
+        tracking['end_time'] = datetime.now()
+        self._open_operations.discard(operation_name)
+        if not self._open_operations:
+            # Last open operation: let the monitor process write its final samples and exit
+            self._stop_event.set()
+            self._process.join(timeout=10)
+        self._read_samples()
+        tracking['end_index'] = self.monitor._sample_count
+        
+        operation_monitor = self.monitor._window(tracking['start_index'], tracking['end_index'])
+        operation_monitor.start_time = tracking['start_time']
+        operation_monitor.end_time = tracking['end_time']
+        tracking['summary'] = operation_monitor.get_summary_stats()
         
         # Save metrics
         filename = f"performance_{operation_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        self.monitor.save_metrics_to_file(filename, 'json')
+        operation_monitor.save_metrics_to_file(filename, 'json')
+        
+        if not self._open_operations:
+            self._close_monitor_process()
         
         logger.info(f"Performance tracking completed for: {operation_name}")
         logger.info(f"Metrics saved to: {filename}")
     
+    def _start_monitor_process(self):
+        """Start the shared monitor process, streaming samples to a fresh temporary file"""
+        fd, self._stream_file = tempfile.mkstemp(prefix='performance_tracking_', suffix='.jsonl')
+        os.close(fd)
+        self._stop_event = multiprocessing.Event()
+        self._process = multiprocessing.Process(
+            target=_run_monitor_process,
+            args=(os.getpid(), self.monitor.monitoring_interval, self._stream_file, self._stop_event),
+            daemon=True
+        )
+        self._process.start()
+        self._stream = open(self._stream_file, 'rb')
+        self.monitor._reset_samples()
+    
+    def _read_samples(self):
+        """Add the samples the monitor process has written since the last read to self.monitor"""
+        for line in self._stream:
+            if not line.endswith(b'\n'):
+                # Still being written: leave it for the next read
+                self._stream.seek(-len(line), os.SEEK_CUR)
+                break
+            self.monitor._store_sample(orjson.loads(line))
+    
+    def _close_monitor_process(self):
+        """Forget the stopped monitor process and remove its stream file"""
+        self._stream.close()
+        os.remove(self._stream_file)
+        self._process = self._stop_event = self._stream_file = self._stream = None
+    
     def get_operation_summary(self, operation_name: str) -> Dict:
         """Get performance summary for a specific operation"""
         if operation_name not in self.operation_metrics:
@@ -351,10 +660,16 @@ def main():
     parser.add_argument('--monitor', action='store_true', help='Start continuous monitoring')
     parser.add_argument('--status', action='store_true', help='Show current system status')
     parser.add_argument('--interval', type=float, default=2.0, help='Monitoring interval in seconds')
+    parser.add_argument('--pid', type=int, help='Record process metrics for this process instead of the monitor itself')
+    parser.add_argument('--network', action='store_true', help='Also record network traffic per sample')
+    parser.add_argument('--stream', type=str, help='Append each sample to this file as JSON lines while monitoring')
+    parser.add_argument('--max-samples', type=int, default=3600,
+                        help='Keep only the latest N samples in memory (0 keeps all)')
     
     args = parser.parse_args()
     
-    monitor = PerformanceMonitor(args.interval)
+    monitor = PerformanceMonitor(args.interval, pid=args.pid, collect_network=args.network,
+                                 max_samples=args.max_samples or None)
     
     if args.status:
         monitor.print_current_status()
@@ -362,7 +677,7 @@ def main():
     elif args.monitor:
         try:
             print("Starting performance monitoring... Press Ctrl+C to stop")
-            monitor.start_monitoring()
+            monitor.start_monitoring(stream_file=args.stream)
             
             while True:
                 time.sleep(5)
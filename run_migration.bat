@@ -10,7 +10,7 @@ REM Check if Python is installed
 python --version >nul 2>&1
 if errorlevel 1 (
     echo ERROR: Python is not installed or not in PATH
-    echo Please install Python 3.7+ and try again
+    echo Please install Python 3.10+ and try again
     pause
     exit /b 1
 )
@@ -4,17 +4,21 @@ Scheduled Synchronization Script
 This script runs continuous synchronization between Sybase and PostgreSQL
 """
 
+import functools
 import logging
+import signal
 import sys
-import time
+import threading
 import schedule
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from data_migration import DataMigration
 from config import MIGRATION_CONFIG
 
 # Configure logging
+@functools.lru_cache(maxsize=None)
 def setup_logging():
-    """Setup logging configuration"""
+    """Setup logging configuration (once per process; later calls are no-ops)"""
     log_level = getattr(logging, MIGRATION_CONFIG['log_level'].upper())
     
     logging.basicConfig(
@@ -26,6 +30,30 @@ def setup_logging():
         ]
     )
 
+# Set to stop the scheduler loop; waiting on it (rather than sleeping) lets a signal end the wait at once
+stop_event = threading.Event()
+
+def signal_handler(signum, frame):
+    """Stop the scheduler loop when the service is asked to terminate"""
+    logging.getLogger(__name__).info(f"Received signal {signum}, stopping scheduled sync service")
+    stop_event.set()
+
+# Tables kept in sync; each has its own DataMigration and connections, so several are synced in parallel
+SYNC_TABLES = ['employees']
+
+@functools.lru_cache(maxsize=None)
+def get_data_migration(table_name):
+    """DataMigration for one table, shared by every sync run so its connections are reused between runs"""
+    return DataMigration(dedicated_sybase=len(SYNC_TABLES) > 1)
+
+def sync_table(table_name):
+    """Incrementally sync one table; returns True on success"""
+    data_migration = get_data_migration(table_name)
+    if not data_migration.check_connections():
+        logging.getLogger(__name__).error(f"✗ Skipping {table_name} sync: databases unreachable")
+        return False
+    return data_migration.incremental_sync(table_name)
+
 def sync_job():
     """Job function to run synchronization"""
     logger = logging.getLogger(__name__)
@@ -34,19 +62,15 @@ def sync_job():
     logger.info("=" * 40)
     
     try:
-        data_migration = DataMigration()
-        
-        # Sync employees table
-        if data_migration.incremental_sync('employees'):
-            logger.info("✓ Employees table sync completed successfully")
-        else:
-            logger.error("✗ Employees table sync failed")
+        # Tables are independent, so sync them side by side
+        with ThreadPoolExecutor(max_workers=len(SYNC_TABLES)) as executor:
+            results = list(executor.map(sync_table, SYNC_TABLES))
         
-        # Add more tables here as needed
-        # if data_migration.incremental_sync('other_table'):
-        #     logger.info("✓ Other table sync completed successfully")
-        # else:
-        #     logger.error("✗ Other table sync failed")
+        for table_name, synced in zip(SYNC_TABLES, results):
+            if synced:
+                logger.info(f"✓ {table_name.capitalize()} table sync completed successfully")
+            else:
+                logger.error(f"✗ {table_name.capitalize()} table sync failed")
         
         logger.info("=" * 40)
         logger.info(f"Scheduled sync completed at {datetime.now()}")
@@ -63,6 +87,8 @@ def main():
     logger.info("Starting scheduled synchronization service...")
     logger.info(f"Sync interval: {MIGRATION_CONFIG['sync_interval_minutes']} minutes")
     
+    signal.signal(signal.SIGTERM, signal_handler)
+    
     # Schedule the sync job
     schedule.every(MIGRATION_CONFIG['sync_interval_minutes']).minutes.do(sync_job)
     
@@ -70,11 +96,16 @@ def main():
     logger.info("Running initial sync...")
     sync_job()
     
-    # Keep the script running
+    # Keep the script running, sleeping exactly until the next job is due
     try:
-        while True:
+        while not stop_event.is_set():
+            idle_seconds = schedule.idle_seconds()
+            if idle_seconds is None:
+                break  # nothing scheduled
+            if idle_seconds > 0 and stop_event.wait(idle_seconds):
+                break
             schedule.run_pending()
-            time.sleep(60)  # Check every minute
+        logger.info("Scheduled sync service stopped")
             
     except KeyboardInterrupt:
         logger.info("Scheduled sync service stopped by user")
@@ -1,97 +1,186 @@
+import hashlib
 import logging
+from collections import defaultdict
+from contextlib import closing
 from database_connections import DatabaseConnections
 from config import MIGRATION_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Sybase -> PostgreSQL column types; anything not listed maps to TEXT
+TYPE_MAPPING = {
+    'int': 'INTEGER',
+    'smallint': 'SMALLINT',
+    'bigint': 'BIGINT',
+    'tinyint': 'SMALLINT',
+    'float': 'DOUBLE PRECISION',
+    'real': 'REAL',
+    'money': 'NUMERIC(19,4)',
+    'smallmoney': 'NUMERIC(10,4)',
+    'text': 'TEXT',
+    'ntext': 'TEXT',
+    'binary': 'BYTEA',
+    'varbinary': 'BYTEA',
+    'image': 'BYTEA',
+    'bit': 'BOOLEAN',
+    'datetime': 'TIMESTAMP',
+    'smalldatetime': 'TIMESTAMP',
+    'date': 'DATE',
+    'time': 'TIME',
+    'timestamp': 'TIMESTAMP'
+}
+
+# Types whose PostgreSQL form depends on the column's (length, precision, scale)
+SIZED_TYPE_MAPPING = {
+    'decimal': lambda length, precision, scale: f'NUMERIC({precision},{scale})',
+    'numeric': lambda length, precision, scale: f'NUMERIC({precision},{scale})',
+    'char': lambda length, precision, scale: f'CHAR({length})',
+    'varchar': lambda length, precision, scale: f'VARCHAR({length})',
+    'nchar': lambda length, precision, scale: f'CHAR({length})',
+    'nvarchar': lambda length, precision, scale: f'VARCHAR({length})'
+}
+
 class SchemaMigration:
     def __init__(self):
         self.db_connections = DatabaseConnections()
+        # Sybase column rows per table name, fetched once per session
+        self._sybase_schema_cache = {}
     
     def create_sample_table_sybase(self):
         """Create the sample employees table in Sybase"""
+        conn = None
         try:
             conn = self.db_connections.get_sybase_connection()
-            cursor = conn.cursor()
-            
-            # Check if table exists using a simpler approach
-            cursor.execute("SELECT COUNT(*) FROM sysobjects WHERE name = 'employees'")
-            table_exists = cursor.fetchone()[0] > 0
-            
-            if not table_exists:
-                # Create table
-                create_table_sql = """
-                CREATE TABLE employees (
-                    id int primary key,
-                    name varchar(100),
-                    dept varchar(50),
-                    salary numeric(10,2),
-                    updated_at datetime default getdate()
-                )
-                """
-                cursor.execute(create_table_sql)
-                logger.info("✓ Employees table created in Sybase")
-            else:
-                logger.info("✓ Employees table already exists in Sybase")
-            
-            # Check if table has data
-            cursor.execute("SELECT COUNT(*) FROM employees")
-            row_count = cursor.fetchone()[0]
-            
-            if row_count == 0:
-                # Insert sample data (Sybase ASE doesn't support multi-row INSERT)
-                sample_data = [
-                    (1, 'Alice', 'HR', 55000.00),
-                    (2, 'Bob', 'IT', 75000.00),
-                    (3, 'Charlie', 'Finance', 62000.00)
-                ]
-                
-                for id, name, dept, salary in sample_data:
-                    cursor.execute(
-                        "INSERT INTO employees (id, name, dept, salary) VALUES (?, ?, ?, ?)",
-                        (id, name, dept, salary)
-                    )
-                logger.info("✓ Sample data inserted in Sybase")
-            else:
-                logger.info(f"✓ Employees table already has {row_count} rows")
+            # The Sybase connection is shared, so the cursor is closed and a failed
+            # setup rolled back rather than left open on it
+            with closing(conn.cursor()) as cursor:
+                self._setup_sample_table_sybase(cursor)
             
             conn.commit()
-            cursor.close()
             logger.info("✓ Sample table setup in Sybase completed successfully")
             return True
             
         except Exception as e:
             logger.error(f"Failed to create sample table in Sybase: {e}")
+            if conn:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
             return False
     
-    def create_table_postgres(self, table_name, columns_sql):
-        """Create table in PostgreSQL"""
-        conn = None
-        try:
-            conn = self.db_connections.get_postgres_connection()
-            cursor = conn.cursor()
-            
-            # Drop table if exists
-            cursor.execute(f"DROP TABLE IF EXISTS {table_name} CASCADE")
-            
+    def _setup_sample_table_sybase(self, cursor):
+        """Create, trigger and seed the Sybase employees table on the given cursor"""
+        # Check if table exists using a simpler approach
+        cursor.execute("SELECT COUNT(*) FROM sysobjects WHERE name = 'employees'")
+        table_exists = cursor.fetchone()[0] > 0
+        
+        if not table_exists:
             # Create table
-            create_sql = f"CREATE TABLE {table_name} ({columns_sql})"
-            cursor.execute(create_sql)
+            create_table_sql = """
+            CREATE TABLE employees (
+                id int primary key,
+                name varchar(100),
+                dept varchar(50),
+                salary numeric(10,2),
+                updated_at datetime default getdate()
+            )
+            """
+            cursor.execute(create_table_sql)
+            logger.info("✓ Employees table created in Sybase")
+        else:
+            logger.info("✓ Employees table already exists in Sybase")
+        
+        # Keep updated_at current on every UPDATE so incremental sync can pick changes up by timestamp
+        cursor.execute("SELECT COUNT(*) FROM sysobjects WHERE name = 'employees_touch_updated_at' AND type = 'TR'")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+            CREATE TRIGGER employees_touch_updated_at ON employees FOR UPDATE AS
+                UPDATE employees SET updated_at = getdate()
+                FROM employees, inserted
+                WHERE employees.id = inserted.id
+            """)
+            logger.info("✓ updated_at trigger created on Sybase employees table")
+        
+        # Check if table has data
+        cursor.execute("SELECT COUNT(*) FROM employees")
+        row_count = cursor.fetchone()[0]
+        
+        if row_count == 0:
+            # Insert sample data (Sybase ASE doesn't support multi-row INSERT, so the
+            # statement is prepared once and executed per parameter row)
+            sample_data = [
+                (1, 'Alice', 'HR', 55000.00),
+                (2, 'Bob', 'IT', 75000.00),
+                (3, 'Charlie', 'Finance', 62000.00)
+            ]
             
-            conn.commit()
-            cursor.close()
-            logger.info(f"✓ Table {table_name} created in PostgreSQL successfully")
-            return True
+            cursor.executemany(
+                "INSERT INTO employees (id, name, dept, salary) VALUES (?, ?, ?, ?)",
+                sample_data
+            )
+            logger.info("✓ Sample data inserted in Sybase")
+        else:
+            logger.info(f"✓ Employees table already has {row_count} rows")
+    
+    def _ddl_fingerprint(self, ddl):
+        """Short stable hash of a DDL statement, ignoring whitespace differences"""
+        return hashlib.blake2b(' '.join(ddl.split()).encode(), digest_size=16).hexdigest()
+    
+    def create_table_postgres(self, table_name, columns_sql, mode='create_if_missing'):
+        """Create table in PostgreSQL
+        
+        mode 'create_if_missing' keeps an existing table built from the same DDL and (re)creates it
+        otherwise; 'truncate' does the same but empties a kept table; 'recreate' always drops and recreates.
+        """
+        if mode not in ('create_if_missing', 'truncate', 'recreate'):
+            raise ValueError("Unsupported mode. Use 'create_if_missing', 'truncate' or 'recreate'")
+        
+        try:
+            with self.db_connections.postgres_connection() as conn, conn.cursor() as cursor:
+                create_sql = f"CREATE TABLE {table_name} ({columns_sql})"
+                ddl_hash = self._ddl_fingerprint(create_sql)
+                
+                # Fingerprints of the DDL last applied per table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS migration_meta (
+                        table_name TEXT PRIMARY KEY,
+                        ddl_hash TEXT NOT NULL
+                    )
+                """)
+                if mode != 'recreate':
+                    cursor.execute("""
+                        SELECT to_regclass(%s) IS NOT NULL
+                               AND EXISTS (SELECT 1 FROM migration_meta WHERE table_name = %s AND ddl_hash = %s)
+                    """, (table_name, table_name, ddl_hash))
+                    if cursor.fetchone()[0]:
+                        if mode == 'truncate':
+                            cursor.execute(f"TRUNCATE TABLE {table_name} RESTART IDENTITY")
+                        conn.commit()
+                        action = "truncated" if mode == 'truncate' else "skipping DDL"
+                        logger.info(f"✓ Table {table_name} schema unchanged in PostgreSQL, {action}")
+                        return True
+                
+                # Drop table if exists (same transaction as the create, so readers never see it missing)
+                cursor.execute(f"DROP TABLE IF EXISTS {table_name} CASCADE")
+                
+                # Create table
+                cursor.execute(create_sql)
+                cursor.execute("""
+                    INSERT INTO migration_meta (table_name, ddl_hash) VALUES (%s, %s)
+                    ON CONFLICT (table_name) DO UPDATE SET ddl_hash = EXCLUDED.ddl_hash
+                """, (table_name, ddl_hash))
+                
+                conn.commit()
+                logger.info(f"✓ Table {table_name} created in PostgreSQL successfully")
+                return True
             
         except Exception as e:
             logger.error(f"Failed to create table {table_name} in PostgreSQL: {e}")
             return False
-        finally:
-            if conn:
-                self.db_connections.return_postgres_connection(conn)
     
-    def migrate_employees_schema(self):
-        """Migrate the employees table schema to PostgreSQL"""
+    def migrate_employees_schema(self, mode='create_if_missing'):
+        """Migrate the employees table schema to PostgreSQL (mode as for create_table_postgres)"""
         columns_sql = """
             id INT PRIMARY KEY,
             name VARCHAR(100),
@@ -100,77 +189,71 @@ class SchemaMigration:
             updated_at TIMESTAMP DEFAULT NOW()
         """
         
-        return self.create_table_postgres('employees', columns_sql)
+        return self.create_table_postgres('employees', columns_sql, mode)
     
     def get_sybase_table_schema(self, table_name):
         """Get table schema from Sybase"""
-        try:
-            conn = self.db_connections.get_sybase_connection()
-            cursor = conn.cursor()
-            
-            # Get column information
-            schema_query = """
-            SELECT 
-                c.name as column_name,
-                t.name as data_type,
-                c.length,
-                c.prec,
-                c.scale,
-                c.isnullable,
-                CASE WHEN pk.column_id IS NOT NULL THEN 1 ELSE 0 END as is_primary_key
-            FROM syscolumns c
-            JOIN systypes t ON c.usertype = t.usertype
-            LEFT JOIN sysindexkeys pk ON c.id = pk.id AND c.colid = pk.colid AND pk.indid = 1
-            WHERE c.id = object_id(?)
-            ORDER BY c.colid
-            """
-            
-            cursor.execute(schema_query, (table_name,))
-            columns = cursor.fetchall()
-            
-            cursor.close()
-            return columns
-            
-        except Exception as e:
-            logger.error(f"Failed to get schema for table {table_name}: {e}")
-            return []
+        return self.get_sybase_schemas([table_name]).get(table_name, [])
+    
+    def get_sybase_schemas(self, table_names):
+        """Get the schemas of several Sybase tables in one catalog query, as {table_name: column rows}
+        
+        Each row is (column_name, data_type, length, prec, scale, isnullable, is_primary_key, table_name).
+        Results are cached for the session; tables that are not found are left out.
+        """
+        missing = [name for name in dict.fromkeys(table_names) if name not in self._sybase_schema_cache]
+        if missing:
+            try:
+                conn = self.db_connections.get_sybase_connection()
+                
+                # Get column information for every requested table in a single round trip
+                schema_query = f"""
+                SELECT 
+                    c.name as column_name,
+                    t.name as data_type,
+                    c.length,
+                    c.prec,
+                    c.scale,
+                    c.isnullable,
+                    CASE WHEN pk.column_id IS NOT NULL THEN 1 ELSE 0 END as is_primary_key,
+                    object_name(c.id) as table_name
+                FROM syscolumns c
+                JOIN systypes t ON c.usertype = t.usertype
+                LEFT JOIN sysindexkeys pk ON c.id = pk.id AND c.colid = pk.colid AND pk.indid = 1
+                WHERE c.id IN ({', '.join('object_id(?)' for _ in missing)})
+                ORDER BY c.id, c.colid
+                """
+                
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute(schema_query, missing)
+                    rows = cursor.fetchall()
+                
+                # object_name() gives the bare name, so match it against owner-qualified requests too
+                columns_by_table = defaultdict(list)
+                for row in rows:
+                    columns_by_table[row[7]].append(row)
+                for name in missing:
+                    columns = columns_by_table.get(name.split('.')[-1])
+                    if columns:
+                        self._sybase_schema_cache[name] = columns
+                
+            except Exception as e:
+                logger.error(f"Failed to get schema for tables {', '.join(missing)}: {e}")
+        
+        return {name: self._sybase_schema_cache[name] for name in table_names if name in self._sybase_schema_cache}
     
     def convert_sybase_to_postgres_type(self, sybase_type, length, precision, scale):
         """Convert Sybase data type to PostgreSQL equivalent"""
-        type_mapping = {
-            'int': 'INTEGER',
-            'smallint': 'SMALLINT',
-            'bigint': 'BIGINT',
-            'tinyint': 'SMALLINT',
-            'decimal': f'NUMERIC({precision},{scale})',
-            'numeric': f'NUMERIC({precision},{scale})',
-            'float': 'DOUBLE PRECISION',
-            'real': 'REAL',
-            'money': 'NUMERIC(19,4)',
-            'smallmoney': 'NUMERIC(10,4)',
-            'char': f'CHAR({length})',
-            'varchar': f'VARCHAR({length})',
-            'text': 'TEXT',
-            'nchar': f'CHAR({length})',
-            'nvarchar': f'VARCHAR({length})',
-            'ntext': 'TEXT',
-            'binary': f'BYTEA',
-            'varbinary': f'BYTEA',
-            'image': 'BYTEA',
-            'bit': 'BOOLEAN',
-            'datetime': 'TIMESTAMP',
-            'smalldatetime': 'TIMESTAMP',
-            'date': 'DATE',
-            'time': 'TIME',
-            'timestamp': 'TIMESTAMP'
-        }
-        
-        return type_mapping.get(sybase_type.lower(), 'TEXT')
+        sybase_type = sybase_type.lower()
+        if sybase_type in SIZED_TYPE_MAPPING:
+            return SIZED_TYPE_MAPPING[sybase_type](length, precision, scale)
+        return TYPE_MAPPING.get(sybase_type, 'TEXT')
     
-    def generate_postgres_schema(self, table_name):
-        """Generate PostgreSQL CREATE TABLE statement from Sybase schema"""
+    def generate_postgres_schema(self, table_name, columns=None):
+        """Generate PostgreSQL CREATE TABLE statement from Sybase schema (columns as from get_sybase_schemas)"""
         try:
-            columns = self.get_sybase_table_schema(table_name)
+            if columns is None:
+                columns = self.get_sybase_table_schema(table_name)
             if not columns:
                 return None
             
@@ -4,12 +4,49 @@ PostgreSQL Database Setup Helper
 This script helps create the PostgreSQL database and tables manually
 """
 
+import atexit
 import psycopg2
-import os
-from dotenv import load_dotenv
+from contextlib import contextmanager
+from psycopg2.pool import ThreadedConnectionPool
+from config import POSTGRES_CONFIG
 
-# Load environment variables
-load_dotenv()
+# Parallel btree build settings for the setup index (the table may already hold bulk test data)
+INDEX_BUILD_WORKERS = 4
+INDEX_BUILD_MEMORY = '512MB'
+
+# One small pool per database, created on first use, so the connection test and the
+# setup steps share connections instead of each paying for a new one
+_pools = {}
+
+def get_pool(dbname):
+    """Get (creating on first use) the connection pool for a database"""
+    if dbname not in _pools:
+        _pools[dbname] = ThreadedConnectionPool(
+            1, 4,
+            host=POSTGRES_CONFIG['host'],
+            port=POSTGRES_CONFIG['port'],
+            user=POSTGRES_CONFIG['user'],
+            password=POSTGRES_CONFIG['password'],
+            dbname=dbname
+        )
+    return _pools[dbname]
+
+@contextmanager
+def pooled_conn(dbname, autocommit=False):
+    """Borrow a connection to a database from its pool for the duration of a with-block"""
+    pool = get_pool(dbname)
+    conn = pool.getconn()
+    try:
+        conn.autocommit = autocommit
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+@atexit.register
+def _close_pools():
+    """Close every pooled connection at interpreter exit"""
+    for pool in _pools.values():
+        pool.closeall()
 
 def setup_postgres_database():
     """Setup PostgreSQL database and tables"""
@@ -17,12 +54,12 @@ def setup_postgres_database():
     print("PostgreSQL Database Setup Helper")
     print("=" * 50)
     
-    # Get configuration from environment
-    host = os.getenv('PG_HOST', 'localhost')
-    port = os.getenv('PG_PORT', '5432')
-    user = os.getenv('PG_USER', 'postgres')
-    password = os.getenv('PG_PASSWORD', 'password')
-    dbname = os.getenv('PG_DB', 'testdb')
+    # Get configuration (read from the environment once, in config)
+    host = POSTGRES_CONFIG['host']
+    port = POSTGRES_CONFIG['port']
+    user = POSTGRES_CONFIG['user']
+    password = POSTGRES_CONFIG['password']
+    dbname = POSTGRES_CONFIG['dbname']
     
     print(f"Host: {host}")
     print(f"Port: {port}")
@@ -33,67 +70,48 @@ def setup_postgres_database():
     try:
         # Step 1: Connect to default postgres database
         print("Step 1: Connecting to default PostgreSQL database...")
-        admin_conn = psycopg2.connect(
-            host=host,
-            port=port,
-            user=user,
-            password=password,
-            dbname='postgres'
-        )
-        admin_conn.autocommit = True
-        print("✓ Connected to PostgreSQL successfully")
-        
-        # Step 2: Create testdb if it doesn't exist
-        print("\nStep 2: Creating database 'testdb'...")
-        with admin_conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
-            if cur.fetchone() is None:
-                cur.execute(f"CREATE DATABASE {dbname}")
-                print(f"✓ Database '{dbname}' created successfully")
-            else:
-                print(f"✓ Database '{dbname}' already exists")
-        
-        admin_conn.close()
+        with pooled_conn('postgres', autocommit=True) as admin_conn:
+            print("✓ Connected to PostgreSQL successfully")
+            
+            # Step 2: Create testdb if it doesn't exist
+            print("\nStep 2: Creating database 'testdb'...")
+            with admin_conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+                if cur.fetchone() is None:
+                    cur.execute(f"CREATE DATABASE {dbname}")
+                    print(f"✓ Database '{dbname}' created successfully")
+                else:
+                    print(f"✓ Database '{dbname}' already exists")
         
         # Step 3: Connect to testdb and create tables
         print("\nStep 3: Creating tables in 'testdb'...")
-        test_conn = psycopg2.connect(
-            host=host,
-            port=port,
-            user=user,
-            password=password,
-            dbname=dbname
-        )
-        test_conn.autocommit = True
-        
-        with test_conn.cursor() as cur:
-            # Create employees table
-            create_table_sql = """
+        with pooled_conn(dbname, autocommit=True) as test_conn, test_conn.cursor() as cur:
+            # Create employees table and its index (one round trip: a parameterless
+            # multi-statement string is sent as a single simple query, which runs as one
+            # implicit transaction, so SET LOCAL scopes the index build settings to it)
+            create_schema_sql = f"""
             CREATE TABLE IF NOT EXISTS employees (
                 id INT PRIMARY KEY,
                 name VARCHAR(100),
                 dept VARCHAR(50),
                 salary NUMERIC(10,2),
                 updated_at TIMESTAMP DEFAULT NOW()
-            )
-            """
-            cur.execute(create_table_sql)
-            print("✓ Employees table created/verified")
-            
-            # Create index
-            create_index_sql = """
+            );
+            SET LOCAL max_parallel_maintenance_workers = {INDEX_BUILD_WORKERS};
+            SET LOCAL maintenance_work_mem = '{INDEX_BUILD_MEMORY}';
             CREATE INDEX IF NOT EXISTS idx_employees_updated_at 
-            ON employees(updated_at)
+            ON employees(updated_at);
             """
-            cur.execute(create_index_sql)
+            cur.execute(create_schema_sql)
+            print("✓ Employees table created/verified")
             print("✓ Index created/verified")
             
-            # Check if table has data
-            cur.execute("SELECT COUNT(*) FROM employees")
-            count = cur.fetchone()[0]
-            print(f"✓ Employees table has {count} rows")
-        
-        test_conn.close()
+            # Check if table has data (stops at the first row instead of counting them all)
+            cur.execute("SELECT EXISTS (SELECT 1 FROM employees)")
+            if cur.fetchone()[0]:
+                print("✓ Employees table already has data")
+            else:
+                print("✓ Employees table is empty")
         
         print("\n🎉 PostgreSQL database setup completed successfully!")
         print("You can now run the migration: python main_migration.py")
@@ -112,32 +130,17 @@ def test_postgres_connection():
     print("Testing PostgreSQL Connection")
     print("=" * 50)
     
-    host = os.getenv('PG_HOST', 'localhost')
-    port = os.getenv('PG_PORT', '5432')
-    user = os.getenv('PG_USER', 'postgres')
-    password = os.getenv('PG_PASSWORD', 'password')
-    dbname = os.getenv('PG_DB', 'testdb')
+    dbname = POSTGRES_CONFIG['dbname']
     
     try:
         # Test connection to testdb
-        conn = psycopg2.connect(
-            host=host,
-            port=port,
-            user=user,
-            password=password,
-            dbname=dbname
-        )
-        
-        with conn.cursor() as cur:
-            cur.execute("SELECT version()")
-            version = cur.fetchone()[0]
+        with pooled_conn(dbname) as conn, conn.cursor() as cur:
+            # Both probes in one round trip
+            cur.execute("SELECT version(), current_database()")
+            version, current_db = cur.fetchone()
             print(f"✓ Connected to PostgreSQL: {version}")
-            
-            cur.execute("SELECT current_database()")
-            current_db = cur.fetchone()[0]
             print(f"✓ Current database: {current_db}")
         
-        conn.close()
         return True
         
     except Exception as e:
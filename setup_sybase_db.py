@@ -5,11 +5,39 @@ This script helps create the proper database and tables in Sybase
 """
 
 import pyodbc
-import os
-from dotenv import load_dotenv
+from graphlib import TopologicalSorter
+from config import SYBASE_CONFIG, sybase_connection_string
 
-# Load environment variables
-load_dotenv()
+# Tables the setup creates, with the tables each one references; they are created
+# in dependency order so foreign keys always point at an existing table
+SAMPLE_TABLES = [
+    {
+        'name': 'employees',
+        'deps': [],
+        'ddl': """
+            CREATE TABLE employees (
+                id int primary key,
+                name varchar(100),
+                dept varchar(50),
+                salary numeric(10,2),
+                updated_at datetime default getdate()
+            )
+        """
+    }
+]
+
+# Rows seeded into an empty employees table
+SAMPLE_EMPLOYEES = [
+    (1, 'Alice', 'HR', 55000.00),
+    (2, 'Bob', 'IT', 75000.00),
+    (3, 'Charlie', 'Finance', 62000.00)
+]
+
+def creation_order(tables):
+    """Table definitions ordered so every table comes after the tables it depends on"""
+    by_name = {table['name']: table for table in tables}
+    graph = {table['name']: table['deps'] for table in tables}
+    return [by_name[name] for name in TopologicalSorter(graph).static_order() if name in by_name]
 
 def setup_sybase_database():
     """Setup Sybase database and tables"""
@@ -17,12 +45,11 @@ def setup_sybase_database():
     print("Sybase Database Setup Helper")
     print("=" * 50)
     
-    # Get configuration from environment
-    driver = os.getenv('SYBASE_DRIVER', 'Adaptive Server Enterprise')
-    server = os.getenv('SYBASE_SERVER', 'localhost')
-    port = os.getenv('SYBASE_PORT', '5000')
-    uid = os.getenv('SYBASE_UID', 'sa')
-    pwd = os.getenv('SYBASE_PWD', 'password')
+    # Get configuration (read from the environment once, in config)
+    driver = SYBASE_CONFIG['driver']
+    server = SYBASE_CONFIG['server']
+    port = SYBASE_CONFIG['port']
+    uid = SYBASE_CONFIG['uid']
     
     print(f"Driver: {driver}")
     print(f"Server: {server}")
@@ -33,58 +60,41 @@ def setup_sybase_database():
     try:
         # Step 1: Connect to master database first
         print("Step 1: Connecting to master database...")
-        master_conn_string = (
-            f"DRIVER={{{driver}}};"
-            f"SERVER={server};"
-            f"PORT={port};"
-            f"UID={uid};"
-            f"PWD={pwd};"
-            f"DATABASE=master"
-        )
-        
-        master_conn = pyodbc.connect(master_conn_string)
+        master_conn = pyodbc.connect(sybase_connection_string('master'))
         print("✓ Connected to master database successfully")
         
         # Step 2: Create tables directly in master database
         print("\nStep 2: Creating tables in master database...")
         cursor = master_conn.cursor()
         
-        # Check if employees table exists
-        cursor.execute("SELECT COUNT(*) FROM sysobjects WHERE name = 'employees'")
-        table_exists = cursor.fetchone()[0] > 0
-        
-        if not table_exists:
-            # Create employees table
-            create_table_sql = """
-            CREATE TABLE employees (
-                id int primary key,
-                name varchar(100),
-                dept varchar(50),
-                salary numeric(10,2),
-                updated_at datetime default getdate()
+        # Create any missing tables, dependencies first; they are committed together
+        # with the sample data at the end
+        for table in creation_order(SAMPLE_TABLES):
+            # object_id() is a direct catalog lookup; NULL means no such table
+            cursor.execute("SELECT object_id(?)", (table['name'],))
+            table_exists = cursor.fetchone()[0] is not None
+            
+            if not table_exists:
+                cursor.execute(table['ddl'])
+                print(f"✓ {table['name'].capitalize()} table created successfully")
+            else:
+                print(f"✓ {table['name'].capitalize()} table already exists")
+        
+        # Check if table has data (stops at the first row instead of counting them all)
+        cursor.execute("SELECT CASE WHEN EXISTS (SELECT 1 FROM employees) THEN 1 ELSE 0 END")
+        has_rows = cursor.fetchone()[0] == 1
+        
+        if not has_rows:
+            # Insert sample data (ASE has no multi-row VALUES; fast_executemany sends all
+            # the parameter rows as one bound array instead of a round trip per row)
+            cursor.fast_executemany = True
+            cursor.executemany(
+                "INSERT INTO employees (id, name, dept, salary) VALUES (?, ?, ?, ?)",
+                SAMPLE_EMPLOYEES
             )
-            """
-            cursor.execute(create_table_sql)
-            print("✓ Employees table created successfully")
-        else:
-            print("✓ Employees table already exists")
-        
-        # Check if table has data
-        cursor.execute("SELECT COUNT(*) FROM employees")
-        row_count = cursor.fetchone()[0]
-        
-        if row_count == 0:
-            # Insert sample data
-            insert_data_sql = """
-            INSERT INTO employees (id, name, dept, salary) VALUES
-            (1, 'Alice', 'HR', 55000.00),
-            (2, 'Bob', 'IT', 75000.00),
-            (3, 'Charlie', 'Finance', 62000.00)
-            """
-            cursor.execute(insert_data_sql)
             print("✓ Sample data inserted successfully")
         else:
-            print(f"✓ Employees table already has {row_count} rows")
+            print("✓ Employees table already has data")
         
         master_conn.commit()
         master_conn.close()
@@ -93,50 +103,6 @@ def setup_sybase_database():
         print("You can now update your .env file to use SYBASE_DB=master")
         return True
         
-        # Check if employees table exists
-        cursor.execute("SELECT COUNT(*) FROM sysobjects WHERE name = 'employees'")
-        table_exists = cursor.fetchone()[0] > 0
-        
-        if not table_exists:
-            # Create employees table
-            create_table_sql = """
-            CREATE TABLE employees (
-                id int primary key,
-                name varchar(100),
-                dept varchar(50),
-                salary numeric(10,2),
-                updated_at datetime default getdate()
-            )
-            """
-            cursor.execute(create_table_sql)
-            print("✓ Employees table created successfully")
-        else:
-            print("✓ Employees table already exists")
-        
-        # Check if table has data
-        cursor.execute("SELECT COUNT(*) FROM employees")
-        row_count = cursor.fetchone()[0]
-        
-        if row_count == 0:
-            # Insert sample data
-            insert_data_sql = """
-            INSERT INTO employees (id, name, dept, salary) VALUES
-            (1, 'Alice', 'HR', 55000.00),
-            (2, 'Bob', 'IT', 75000.00),
-            (3, 'Charlie', 'Finance', 62000.00)
-            """
-            cursor.execute(insert_data_sql)
-            print("✓ Sample data inserted successfully")
-        else:
-            print(f"✓ Employees table already has {row_count} rows")
-        
-        testdb_conn.commit()
-        testdb_conn.close()
-        
-        print("\n🎉 Sybase database setup completed successfully!")
-        print("You can now update your .env file to use SYBASE_DB=testdb")
-        return True
-        
     except pyodbc.Error as e:
         print(f"\n❌ ODBC Error: {e}")
         return False
@@ -150,23 +116,8 @@ def test_connection_to_master():
     print("Testing Connection to master database")
     print("=" * 50)
     
-    driver = os.getenv('SYBASE_DRIVER', 'Adaptive Server Enterprise')
-    server = os.getenv('SYBASE_SERVER', 'localhost')
-    port = os.getenv('SYBASE_PORT', '5000')
-    uid = os.getenv('SYBASE_UID', 'sa')
-    pwd = os.getenv('SYBASE_PWD', 'password')
-    
     try:
-        connection_string = (
-            f"DRIVER={{{driver}}};"
-            f"SERVER={server};"
-            f"PORT={port};"
-            f"UID={uid};"
-            f"PWD={pwd};"
-            f"DATABASE=master"
-        )
-        
-        conn = pyodbc.connect(connection_string)
+        conn = pyodbc.connect(sybase_connection_string('master'))
         cursor = conn.cursor()
         
         # Test query
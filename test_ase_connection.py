@@ -4,12 +4,19 @@ Test ASE Driver Connection
 This script tests the connection to Sybase using the ASE driver
 """
 
-import pyodbc
+import functools
 import os
-from dotenv import load_dotenv
+import pyodbc
+from config import SYBASE_CONFIG, sybase_connection_string
+
+@functools.lru_cache(maxsize=None)
+def _installed_drivers(odbc_config_paths):
+    """ODBC driver names, looked up once per ODBCSYSINI/ODBCINI setting"""
+    return tuple(pyodbc.drivers())
 
-# Load environment variables
-load_dotenv()
+def get_available_drivers():
+    """Installed ODBC driver names (the driver registry is only scanned on first call)"""
+    return _installed_drivers((os.environ.get('ODBCSYSINI'), os.environ.get('ODBCINI')))
 
 def test_ase_connection():
     """Test connection to Sybase using ASE driver"""
@@ -17,13 +24,12 @@ def test_ase_connection():
     print("Testing Sybase ASE Driver Connection")
     print("=" * 50)
     
-    # Get configuration from environment
-    driver = os.getenv('SYBASE_DRIVER', 'Adaptive Server Enterprise')
-    server = os.getenv('SYBASE_SERVER', 'localhost')
-    port = os.getenv('SYBASE_PORT', '5000')
-    uid = os.getenv('SYBASE_UID', 'sa')
-    pwd = os.getenv('SYBASE_PWD', 'password')
-    database = os.getenv('SYBASE_DB', 'testdb')
+    # Get configuration (read from the environment once, in config)
+    driver = SYBASE_CONFIG['driver']
+    server = SYBASE_CONFIG['server']
+    port = SYBASE_CONFIG['port']
+    uid = SYBASE_CONFIG['uid']
+    database = SYBASE_CONFIG['database']
     
     print(f"Driver: {driver}")
     print(f"Server: {server}")
@@ -34,14 +40,7 @@ def test_ase_connection():
     
     try:
         # Build connection string
-        connection_string = (
-            f"DRIVER={{{driver}}};"
-            f"SERVER={server};"
-            f"PORT={port};"
-            f"UID={uid};"
-            f"PWD={pwd};"
-            f"DATABASE={database}"
-        )
+        connection_string = sybase_connection_string(database)
         
         print("Connection string:")
         print(connection_string)
@@ -83,7 +82,7 @@ def list_available_drivers():
     print("Available ODBC Drivers")
     print("=" * 50)
     
-    drivers = pyodbc.drivers()
+    drivers = get_available_drivers()
     if drivers:
         for i, driver in enumerate(drivers, 1):
             print(f"{i}. {driver}")
@@ -9,23 +9,28 @@ try:
     print("1. Testing basic Python imports...")
     import sys
     import os
+    import time
     print("✓ Basic imports successful")
     
     print("2. Testing dotenv...")
+    start_ns = time.perf_counter_ns()
     from dotenv import load_dotenv
-    print("✓ Dotenv import successful")
-    ``
+    print(f"✓ Dotenv import successful ({(time.perf_counter_ns() - start_ns) / 1e6:.1f} ms)")
+    
     print("3. Testing psycopg2...")
+    start_ns = time.perf_counter_ns()
     import psycopg2
-    print("✓ Psycopg2 import successful")
+    print(f"✓ Psycopg2 import successful ({(time.perf_counter_ns() - start_ns) / 1e6:.1f} ms)")
     
     print("4. Testing pyodbc...")
+    start_ns = time.perf_counter_ns()
     import pyodbc
-    print("✓ Pyodbc import successful")
+    print(f"✓ Pyodbc import successful ({(time.perf_counter_ns() - start_ns) / 1e6:.1f} ms)")
     
     print("5. Testing schedule...")
+    start_ns = time.perf_counter_ns()
     import schedule
-    print("✓ Schedule import successful")
+    print(f"✓ Schedule import successful ({(time.perf_counter_ns() - start_ns) / 1e6:.1f} ms)")
     
     print("\n✓ All imports successful!")
     
@@ -7,10 +7,18 @@ Tests migration performance with large datasets (1 crore records)
 import sys
 import os
 import time
+import atexit
 import psutil
 import logging
+import logging.handlers
+import queue
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import datetime
-from typing import List, Dict, Tuple
+from itertools import chain
+from typing import Dict, Iterator, Optional
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -21,32 +29,83 @@ from schema_migration import SchemaMigration
 from data_migration import DataMigration
 from config import MIGRATION_CONFIG
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bulk_migration_test.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure logging; records are handed to a listener thread that writes the file and
+# console, so the insert and COPY threads never wait on a slow terminal
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_handlers = [logging.FileHandler('bulk_migration_test.log'), logging.StreamHandler(sys.stdout)]
+for log_handler in log_handlers:
+    log_handler.setFormatter(log_formatter)
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))  # full format is applied by the listener's handlers
+# force replaces the console-only handler bulk_data_generator installs when it is imported
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler], force=True)
 logger = logging.getLogger(__name__)
 
+# Test rows are generated in batches from this seed whenever they are needed, so every
+# step sees the same rows without the whole dataset ever being held in memory
+DATA_SEED = 20240101
+
+# Sybase bulk insert progress is logged at INFO once per this many rows (per batch at DEBUG)
+INSERT_PROGRESS_ROWS = 1000000
+
+# Batches the generator thread may run ahead of the Sybase inserts
+PREFETCH_BATCHES = 8
+
+@dataclass(slots=True)
+class PhaseMetrics:
+    """Timing and memory figures for one bulk test step"""
+    record_count: Optional[int] = None
+    duration_seconds: float = 0.0
+    records_per_second: Optional[float] = None
+    extra: Dict = field(default_factory=dict)  # step-specific figures, e.g. batch_size
+    start_memory: Dict = field(default_factory=dict)
+    end_memory: Dict = field(default_factory=dict)
+    memory_delta_mb: float = 0.0
+    
+    def report_items(self) -> Iterator:
+        """(name, value) pairs in report order, leaving out figures the step doesn't have"""
+        if self.record_count is not None:
+            yield 'record_count', self.record_count
+        yield 'duration_seconds', self.duration_seconds
+        if self.records_per_second is not None:
+            yield 'records_per_second', self.records_per_second
+        yield from self.extra.items()
+        yield 'start_memory', self.start_memory
+        yield 'end_memory', self.end_memory
+        yield 'memory_delta_mb', self.memory_delta_mb
+
+@lru_cache(maxsize=32)
+def insert_sql(table_name: str, column_names: tuple) -> str:
+    """Parameterized Sybase INSERT for one (table, columns) shape, built once per shape"""
+    return f"INSERT INTO {table_name} ({','.join(column_names)}) VALUES ({','.join('?' * len(column_names))})"
+
 class BulkMigrationTester:
     """Test bulk migration performance with large datasets"""
     
-    def __init__(self):
+    def __init__(self, parallel_workers: Optional[int] = None):
         self.db_connections = DatabaseConnections()
         self.schema_migration = SchemaMigration()
         self.data_migration = DataMigration()
-        self.performance_metrics = {}
+        if parallel_workers is not None:
+            # Number of concurrent COPY writers, each on its own pooled PostgreSQL connection
+            self.data_migration.parallel_workers = max(1, parallel_workers)
+        self.performance_metrics: Dict[str, PhaseMetrics] = {}
+        # Reused by measure_memory_usage so each sample is a single /proc read
+        self._process = psutil.Process()
+        self._memory_total = psutil.virtual_memory().total
         
     def get_system_info(self) -> Dict:
         """Get system information for performance analysis"""
+        memory = psutil.virtual_memory()  # one snapshot for both figures
         return {
             'cpu_count': psutil.cpu_count(),
-            'memory_total_gb': round(psutil.virtual_memory().total / (1024**3), 2),
-            'memory_available_gb': round(psutil.virtual_memory().available / (1024**3), 2),
+            'physical_cpu_count': psutil.cpu_count(logical=False),
+            'memory_total_gb': round(memory.total / (1024**3), 2),
+            'memory_available_gb': round(memory.available / (1024**3), 2),
             'disk_usage': psutil.disk_usage('/').percent if os.name != 'nt' else 0,
             'python_version': sys.version,
             'platform': sys.platform
@@ -54,46 +113,59 @@ class BulkMigrationTester:
     
     def measure_memory_usage(self) -> Dict:
         """Measure current memory usage"""
-        process = psutil.Process()
-        memory_info = process.memory_info()
+        memory_info = self._process.memory_info()
         return {
             'rss_mb': round(memory_info.rss / (1024**2), 2),
             'vms_mb': round(memory_info.vms / (1024**2), 2),
-            'percent': process.memory_percent()
+            'percent': memory_info.rss / self._memory_total * 100
         }
     
+    def _record_metrics(self, test_name: str, metrics: PhaseMetrics, start_memory: Dict, end_memory: Dict,
+                        duration: float) -> PhaseMetrics:
+        """Fill in a test step's timing and memory figures and store it in performance_metrics (never raises on odd input)"""
+        metrics.duration_seconds = round(duration, 2)
+        if metrics.record_count is not None:
+            metrics.records_per_second = round(metrics.record_count / duration, 2) if duration > 0 else 0
+        metrics.start_memory = start_memory
+        metrics.end_memory = end_memory
+        metrics.memory_delta_mb = round(end_memory.get('rss_mb', 0) - start_memory.get('rss_mb', 0), 2)
+        self.performance_metrics[test_name] = metrics
+        return metrics
+    
+    @contextmanager
+    def _timed(self, test_name: str, record_count: Optional[int] = None, **extra) -> Iterator[PhaseMetrics]:
+        """Time a with-block on the monotonic clock and record it under test_name with memory before and after
+        
+        The yielded PhaseMetrics is filled in on exit; the block can set record_count or add extra
+        figures on it first when they are only known at the end.
+        """
+        step = PhaseMetrics(record_count=record_count, extra=extra)
+        start_memory = self.measure_memory_usage()
+        start_ns = time.perf_counter_ns()
+        yield step
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
+        end_memory = self.measure_memory_usage()
+        self._record_metrics(test_name, step, start_memory, end_memory, duration)
+    
     def test_schema_creation(self) -> bool:
         """Test schema creation performance"""
         logger.info("Testing schema creation performance...")
         
-        start_time = time.time()
-        start_memory = self.measure_memory_usage()
-        
         try:
-            # Create sample table in Sybase
-            if not self.schema_migration.create_sample_table_sybase():
-                logger.error("Failed to create sample table in Sybase")
-                return False
-            
-            # Create table schema in PostgreSQL
-            if not self.schema_migration.migrate_employees_schema():
-                logger.error("Failed to create table schema in PostgreSQL")
-                return False
-            
-            end_time = time.time()
-            end_memory = self.measure_memory_usage()
-            
-            duration = end_time - start_time
-            
-            self.performance_metrics['schema_creation'] = {
-                'duration_seconds': round(duration, 2),
-                'start_memory': start_memory,
-                'end_memory': end_memory,
-                'memory_delta_mb': round(end_memory['rss_mb'] - start_memory['rss_mb'], 2)
-            }
+            with self._timed('schema_creation') as step:
+                # Create sample table in Sybase
+                if not self.schema_migration.create_sample_table_sybase():
+                    logger.error("Failed to create sample table in Sybase")
+                    return False
+                
+                # Create table schema in PostgreSQL, emptying a table left by an earlier run so the
+                # migration under test is a cold load (COPY) of exactly the rows inserted below
+                if not self.schema_migration.migrate_employees_schema(mode='truncate'):
+                    logger.error("Failed to create table schema in PostgreSQL")
+                    return False
             
-            logger.info(f"Schema creation completed in {duration:.2f} seconds")
-            logger.info(f"Memory usage: {start_memory['rss_mb']}MB → {end_memory['rss_mb']}MB")
+            logger.info(f"Schema creation completed in {step.duration_seconds:.2f} seconds")
+            logger.info(f"Memory usage: {step.start_memory['rss_mb']}MB → {step.end_memory['rss_mb']}MB")
             
             return True
             
@@ -101,137 +173,162 @@ class BulkMigrationTester:
             logger.error(f"Schema creation test failed: {e}")
             return False
     
-    def test_data_generation(self, record_count: int = 1000000) -> Tuple[bool, List[Dict]]:
+    def generate_test_batches(self, record_count: int, batch_size: int) -> Iterator[Dict[str, list]]:
+        """Stream the test dataset (the same rows on every call) as column batches of batch_size records"""
+        generator = BulkDataGenerator(record_count, seed=DATA_SEED)
+        generator.batch_size = batch_size
+        return generator.generate_all_data(columnar=True)
+    
+    def prefetch_batches(self, batches: Iterator, depth: int = PREFETCH_BATCHES) -> Iterator:
+        """Iterate batches while a background thread produces the next ones, at most depth ahead
+        
+        Generation (NumPy) and inserts (pyodbc) both release the GIL for much of their work, so
+        the two overlap instead of taking turns. A generator error is re-raised here.
+        """
+        buffer = queue.Queue(maxsize=depth)
+        stop = threading.Event()
+        done = object()
+        
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def produce():
+            try:
+                for batch in batches:
+                    if not put(batch):
+                        return
+                put(done)
+            except Exception as e:
+                put(e)
+        
+        producer = threading.Thread(target=produce, name="batch-prefetch", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Unblocks the producer if the consumer stopped early
+            stop.set()
+            producer.join()
+    
+    def test_data_generation(self, record_count: int = 1000000) -> bool:
         """Test data generation performance"""
         logger.info(f"Testing data generation performance for {record_count:,} records...")
         
-        start_time = time.time()
-        start_memory = self.measure_memory_usage()
-        
         try:
-            generator = BulkDataGenerator(record_count)
-            generator.batch_size = 10000  # Smaller batches for testing
-            
-            # Generate sample data
-            sample_data = generator.generate_sample_data(record_count)
-            
-            end_time = time.time()
-            end_memory = self.measure_memory_usage()
+            with self._timed('data_generation', record_count) as step:
+                # Generate the sample data batch by batch; batches are dropped once counted
+                generated = 0
+                for batch in self.generate_test_batches(record_count, 10000):  # Smaller batches for testing
+                    generated += len(next(iter(batch.values())))
             
-            duration = end_time - start_time
+            logger.info(f"Data generation completed in {step.duration_seconds:.2f} seconds")
+            logger.info(f"Speed: {step.records_per_second:,.0f} records/second")
+            logger.info(f"Memory usage: {step.start_memory['rss_mb']}MB → {step.end_memory['rss_mb']}MB")
             
-            self.performance_metrics['data_generation'] = {
-                'record_count': record_count,
-                'duration_seconds': round(duration, 2),
-                'records_per_second': round(record_count / duration, 2),
-                'start_memory': start_memory,
-                'end_memory': end_memory,
-                'memory_delta_mb': round(end_memory['rss_mb'] - start_memory['rss_mb'], 2)
-            }
-            
-            logger.info(f"Data generation completed in {duration:.2f} seconds")
-            logger.info(f"Speed: {record_count / duration:,.0f} records/second")
-            logger.info(f"Memory usage: {start_memory['rss_mb']}MB → {end_memory['rss_mb']}MB")
-            
-            return True, sample_data
+            return generated == record_count
             
         except Exception as e:
             logger.error(f"Data generation test failed: {e}")
-            return False, []
+            return False
     
-    def test_bulk_insert_sybase(self, data: List[Dict]) -> bool:
+    def test_bulk_insert_sybase(self, record_count: int) -> bool:
         """Test bulk insert performance in Sybase"""
-        logger.info(f"Testing bulk insert performance in Sybase for {len(data):,} records...")
-        
-        start_time = time.time()
-        start_memory = self.measure_memory_usage()
+        logger.info(f"Testing bulk insert performance in Sybase for {record_count:,} records...")
         
+        syb_conn = syb_cur = batches = None
         try:
-            syb_conn = self.db_connections.get_sybase_connection()
-            syb_cur = syb_conn.cursor()
-            
-            # Clear existing data
-            syb_cur.execute("DELETE FROM employees")
-            syb_conn.commit()
-            
-            # Insert data in batches
-            batch_size = 1000
-            total_inserted = 0
-            
-            for i in range(0, len(data), batch_size):
-                batch = data[i:i + batch_size]
+            with self._timed('sybase_bulk_insert') as step:
+                syb_conn = self.db_connections.get_sybase_connection()
+                # The whole load is one transaction, committed once after the last batch
+                syb_conn.autocommit = False
+                syb_cur = syb_conn.cursor()
                 
-                # Prepare batch insert
-                placeholders = ','.join(['?' for _ in batch[0].keys()])
-                columns = ','.join(batch[0].keys())
-                sql = f"INSERT INTO employees ({columns}) VALUES ({placeholders})"
+                # Clear existing data (TRUNCATE deallocates pages instead of logging every deleted row)
+                syb_cur.execute("TRUNCATE TABLE employees")
+                syb_conn.commit()
                 
-                # Execute batch insert
-                batch_values = [tuple(record.values()) for record in batch]
-                syb_cur.executemany(sql, batch_values)
+                # Insert data in batches
+                batch_size = 1000
+                total_inserted = 0
                 
-                total_inserted += len(batch)
-                if i % 10000 == 0:
-                    logger.info(f"Inserted {total_inserted:,} records...")
-            
-            syb_conn.commit()
-            syb_cur.close()
-            syb_conn.close()
-            
-            end_time = time.time()
-            end_memory = self.measure_memory_usage()
-            
-            duration = end_time - start_time
-            
-            self.performance_metrics['sybase_bulk_insert'] = {
-                'record_count': len(data),
-                'duration_seconds': round(duration, 2),
-                'records_per_second': round(len(data) / duration, 2),
-                'batch_size': batch_size,
-                'start_memory': start_memory,
-                'end_memory': end_memory,
-                'memory_delta_mb': round(end_memory['rss_mb'] - start_memory['rss_mb'], 2)
-            }
+                # Batches are generated on a separate thread while earlier ones are being inserted
+                batches = self.prefetch_batches(self.generate_test_batches(record_count, batch_size))
+                first_batch = next(batches)
+                
+                # Prepare batch insert once; every batch has the first batch's columns. pyodbc keeps
+                # the statement prepared on the cursor while the same SQL string is executed
+                column_names = tuple(first_batch)
+                sql = insert_sql('employees', column_names)
+                
+                for batch in chain([first_batch], batches):
+                    # Execute batch insert; the batch is column lists, so zip turns it into rows
+                    batch_values = list(zip(*[batch[name] for name in column_names]))
+                    syb_cur.executemany(sql, batch_values)
+                
+                    total_inserted += len(batch_values)
+                    if total_inserted % INSERT_PROGRESS_ROWS < len(batch_values):
+                        logger.info("Inserted %s records...", f"{total_inserted:,}")
+                    elif logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Inserted %s records...", f"{total_inserted:,}")
+                
+                syb_conn.commit()
+                step.record_count = total_inserted
+                step.extra['batch_size'] = batch_size
             
-            logger.info(f"Sybase bulk insert completed in {duration:.2f} seconds")
-            logger.info(f"Speed: {len(data) / duration:,.0f} records/second")
+            logger.info(f"Sybase bulk insert completed in {step.duration_seconds:.2f} seconds")
+            logger.info(f"Speed: {step.records_per_second:,.0f} records/second")
             
             return True
             
         except Exception as e:
             logger.error(f"Sybase bulk insert test failed: {e}")
+            # The shared connection must not keep the TRUNCATE and a partial load open for later steps
+            if syb_conn is not None:
+                try:
+                    syb_conn.rollback()
+                except Exception as rollback_error:
+                    logger.warning(f"Sybase rollback failed: {rollback_error}")
             return False
-    
-    def test_bulk_migration(self, data: List[Dict]) -> bool:
-        """Test bulk migration performance from Sybase to PostgreSQL"""
-        logger.info(f"Testing bulk migration performance for {len(data):,} records...")
         
-        start_time = time.time()
-        start_memory = self.measure_memory_usage()
+        finally:
+            # Stops the prefetch thread right away if the load ended early
+            if batches is not None:
+                batches.close()
+            # The connection is the process-wide shared one, reused by the migration and
+            # verification steps, so only the cursor is closed here
+            if syb_cur is not None:
+                try:
+                    syb_cur.close()
+                except Exception as close_error:
+                    logger.warning(f"Error closing Sybase cursor: {close_error}")
+    
+    def test_bulk_migration(self, record_count: int) -> bool:
+        """Test bulk migration performance from Sybase to PostgreSQL (COPY FREEZE only with --workers 1)"""
+        logger.info(f"Testing bulk migration performance for {record_count:,} records...")
         
         try:
-            # Perform data migration
-            if not self.data_migration.migrate_employees_data():
-                logger.error("Bulk migration failed")
-                return False
-            
-            end_time = time.time()
-            end_memory = self.measure_memory_usage()
-            
-            duration = end_time - start_time
-            
-            self.performance_metrics['bulk_migration'] = {
-                'record_count': len(data),
-                'duration_seconds': round(duration, 2),
-                'records_per_second': round(len(data) / duration, 2),
-                'start_memory': start_memory,
-                'end_memory': end_memory,
-                'memory_delta_mb': round(end_memory['rss_mb'] - start_memory['rss_memory'], 2)
-            }
+            with self._timed('bulk_migration', record_count,
+                             parallel_workers=self.data_migration.parallel_workers) as step:
+                # Perform data migration
+                if not self.data_migration.migrate_employees_data():
+                    logger.error("Bulk migration failed")
+                    return False
             
-            logger.info(f"Bulk migration completed in {duration:.2f} seconds")
-            logger.info(f"Speed: {len(data):,} records in {duration:.2f} seconds")
-            logger.info(f"Rate: {len(data) / duration:,.0f} records/second")
+            logger.info(f"Bulk migration completed in {step.duration_seconds:.2f} seconds")
+            logger.info(f"Speed: {record_count:,} records in {step.duration_seconds:.2f} seconds")
+            logger.info(f"Rate: {step.records_per_second:,.0f} records/second")
             
             return True
             
@@ -243,28 +340,14 @@ class BulkMigrationTester:
         """Test data verification performance"""
         logger.info("Testing data verification performance...")
         
-        start_time = time.time()
-        start_memory = self.measure_memory_usage()
-        
         try:
-            # Verify migration
-            if not self.data_migration.verify_migration(table_name):
-                logger.error("Data verification failed")
-                return False
-            
-            end_time = time.time()
-            end_memory = self.measure_memory_usage()
+            with self._timed('verification') as step:
+                # Verify migration
+                if not self.data_migration.verify_migration(table_name):
+                    logger.error("Data verification failed")
+                    return False
             
-            duration = end_time - start_time
-            
-            self.performance_metrics['verification'] = {
-                'duration_seconds': round(duration, 2),
-                'start_memory': start_memory,
-                'end_memory': end_memory,
-                'memory_delta_mb': round(end_memory['rss_mb'] - start_memory['rss_mb'], 2)
-            }
-            
-            logger.info(f"Data verification completed in {duration:.2f} seconds")
+            logger.info(f"Data verification completed in {step.duration_seconds:.2f} seconds")
             
             return True
             
@@ -282,7 +365,7 @@ class BulkMigrationTester:
         system_info = self.get_system_info()
         logger.info(f"System Info: {system_info}")
         
-        test_start_time = time.time()
+        test_start_time = time.perf_counter()
         
         try:
             # Test database connections
@@ -298,18 +381,17 @@ class BulkMigrationTester:
             
             # Test data generation
             logger.info("\n3. Testing data generation...")
-            success, test_data = self.test_data_generation(record_count)
-            if not success:
+            if not self.test_data_generation(record_count):
                 return False
             
             # Test Sybase bulk insert
             logger.info("\n4. Testing Sybase bulk insert...")
-            if not self.test_bulk_insert_sybase(test_data):
+            if not self.test_bulk_insert_sybase(record_count):
                 return False
             
             # Test bulk migration
             logger.info("\n5. Testing bulk migration...")
-            if not self.test_bulk_migration(test_data):
+            if not self.test_bulk_migration(record_count):
                 return False
             
             # Test verification
@@ -317,7 +399,7 @@ class BulkMigrationTester:
             if not self.test_verification():
                 return False
             
-            test_end_time = time.time()
+            test_end_time = time.perf_counter()
             total_duration = test_end_time - test_start_time
             
             # Generate performance report
@@ -331,9 +413,8 @@ class BulkMigrationTester:
             return True
             
         except Exception as e:
-            logger.error(f"Bulk migration test failed: {e}")
-            import traceback
-            traceback.print_exc()
+            # One log record carrying the traceback, so it reaches the log file as well as the console
+            logger.exception(f"Bulk migration test failed: {e}")
             return False
     
     def generate_performance_report(self, total_duration: float):
@@ -344,10 +425,10 @@ class BulkMigrationTester:
         
         for test_name, metrics in self.performance_metrics.items():
             logger.info(f"\n{test_name.upper().replace('_', ' ')}:")
-            for key, value in metrics.items():
+            for key, value in metrics.report_items():
                 if isinstance(value, dict):
                     logger.info(f"  {key}:")
-                    for sub_key, sub_value in metrics[key].items():
+                    for sub_key, sub_value in value.items():
                         logger.info(f"    {sub_key}: {sub_value}")
                 else:
                     logger.info(f"  {key}: {value}")
@@ -359,10 +440,10 @@ class BulkMigrationTester:
         total_migration_time = 0
         
         for test_name, metrics in self.performance_metrics.items():
-            if 'record_count' in metrics:
-                total_records += metrics['record_count']
-            if 'bulk_migration' in test_name and 'duration_seconds' in metrics:
-                total_migration_time += metrics['duration_seconds']
+            if metrics.record_count is not None:
+                total_records += metrics.record_count
+            if 'bulk_migration' in test_name:
+                total_migration_time += metrics.duration_seconds
         
         if total_records > 0 and total_migration_time > 0:
             overall_rate = total_records / total_migration_time
@@ -378,6 +459,9 @@ def main():
                        help='Number of records to test with (default: 1M)')
     parser.add_argument('--quick', action='store_true', 
                        help='Run quick test with smaller dataset')
+    parser.add_argument('--workers', type=int,
+                       help='Parallel PostgreSQL COPY workers for the migration step '
+                            f'(default: {min(8, os.cpu_count() or 1)}, 1 for a single-connection COPY FREEZE)')
     
     args = parser.parse_args()
     
@@ -388,7 +472,7 @@ def main():
         record_count = args.records
     
     # Initialize tester
-    tester = BulkMigrationTester()
+    tester = BulkMigrationTester(args.workers if args.workers is not None else min(8, os.cpu_count() or 1))
     
     # Run the test
     success = tester.run_full_test(record_count)
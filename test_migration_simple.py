@@ -3,40 +3,44 @@
 Simple test to check if main_migration.py can run
 """
 
+import importlib
+import importlib.util
 import sys
 import os
+import traceback
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    print("Testing import of main_migration...")
-    import main_migration
-    print("✓ Import successful")
-    
-    print("Testing import of database_connections...")
-    from database_connections import DatabaseConnections
-    print("✓ Database connections import successful")
-    
-    print("Testing import of schema_migration...")
-    from schema_migration import SchemaMigration
-    print("✓ Schema migration import successful")
-    
-    print("Testing import of data_migration...")
-    from data_migration import DataMigration
-    print("✓ Data migration import successful")
-    
-    print("Testing import of config...")
-    from config import MIGRATION_CONFIG
-    print("✓ Config import successful")
-    
-    print("\n✓ All imports successful! The script should run.")
-    
-except Exception as e:
-    print(f"✗ Import failed: {e}")
-    import traceback
-    traceback.print_exc()
+# Modules main_migration needs, with the label printed for each
+MIGRATION_MODULES = [
+    ('main_migration', "main_migration"),
+    ('database_connections', "Database connections"),
+    ('schema_migration', "Schema migration"),
+    ('data_migration', "Data migration"),
+    ('config', "Config")
+]
 
+# Locate every module first (no code is run), so all missing files are reported together
+missing = [name for name, _ in MIGRATION_MODULES if importlib.util.find_spec(name) is None]
+if missing:
+    print(f"✗ Modules not found: {', '.join(missing)}")
+    sys.exit(1)
 
+# main_migration imports the others, so after it they are already in sys.modules
+failures = []
+for name, label in MIGRATION_MODULES:
+    print(f"Testing import of {name}...")
+    try:
+        importlib.import_module(name)
+        print(f"✓ {label} import successful")
+    except Exception as e:
+        print(f"✗ {label} import failed: {e}")
+        traceback.print_exc()
+        failures.append(name)
 
+if failures:
+    print(f"\n✗ {len(failures)} import(s) failed: {', '.join(failures)}")
+    sys.exit(1)
 
+print("\n✓ All imports successful! The script should run.")
@@ -128,6 +128,7 @@ def test_data_migration():
     logger.info("Testing Data Migration")
     logger.info("=" * 50)
     
+    data_migration = None
     try:
         data_migration = DataMigration()
         
@@ -160,6 +161,9 @@ def test_data_migration():
     except Exception as e:
         logger.error(f"✗ Data migration test failed: {e}")
         return False
+    finally:
+        if data_migration is not None:
+            data_migration.close()
 
 def show_row_counts():
     """Show row counts in both databases"""
@@ -168,6 +172,7 @@ def show_row_counts():
     logger.info("Row Counts")
     logger.info("=" * 50)
     
+    data_migration = None
     try:
         data_migration = DataMigration()
         
@@ -187,6 +192,9 @@ def show_row_counts():
     except Exception as e:
         logger.error(f"✗ Failed to get row counts: {e}")
         return False
+    finally:
+        if data_migration is not None:
+            data_migration.close()
 
 def main():
     """Main test function"""